@@ -1,25 +1,22 @@
-from flask import Flask, request, jsonify
-from surprise import Dataset, Reader, SVD
-from surprise.model_selection import train_test_split
-from sklearn.feature_extraction.text import TfidfVectorizer
-from sklearn.metrics.pairwise import cosine_similarity
-from sklearn.preprocessing import MinMaxScaler
-import pandas as pd
-import numpy as np
-from scipy.sparse import csr_matrix
-import joblib
-import asyncio
+from flask import Flask, Response, current_app, request, jsonify, stream_with_context
+from flask.helpers import get_debug_flag
+import click
+import json
 import os
-from threading import Lock
+from threading import Lock, Thread
 import logging
-from typing import List, Dict, Union
-from prometheus_client import Histogram, Counter, Gauge
+import multiprocessing
+from contextlib import contextmanager
+from functools import wraps
+from queue import Full
+from typing import Dict, Iterator
+from prometheus_client import CONTENT_TYPE_LATEST, Gauge, generate_latest
 from datetime import datetime
 from models import db, Student, StudentProfile, Course, CourseModule, CourseEnrollment, Engagement, Achievement, Event, EventAttendee, LearningGoal, ActivityLog
 from flask_cors import CORS
 from config import Config
+from pipeline_metrics import stage_timer
 from flask_migrate import Migrate
-import openai 
 import time 
 
 
@@ -27,362 +24,311 @@ from flask_jwt_extended import (
     JWTManager, create_access_token, jwt_required, get_jwt_identity
 )
 from werkzeug.security import generate_password_hash, check_password_hash
+from werkzeug.serving import is_running_from_reloader
 from dotenv import load_dotenv
 
 
 load_dotenv()
 
 # Monitoring setup
-RECOMMENDATION_LATENCY = Histogram('recommendation_latency_seconds', 'Time spent processing recommendations')
-ENGAGEMENT_SCORE_GAUGE = Gauge('engagement_score_average', 'Average engagement score across all students')
-MODEL_TRAINING_DURATION = Histogram('model_training_duration_seconds', 'Time spent training models')
-INTERACTION_COUNTER = Counter('interaction_total', 'Total number of logged interactions')
-base_dir = os.path.dirname(os.path.abspath(__file__))
-data_dir = os.path.join(base_dir, 'data')
-
-# Ensure the data directory exists
-os.makedirs(data_dir, exist_ok=True)
-
-# Check if required files exist
-students_path = os.path.join(data_dir, 'students.csv')
-courses_path = os.path.join(data_dir, 'courses.csv')
-engagement_path = os.path.join(data_dir, 'engagement.csv')
+STARTUP_PHASE_DURATION = Gauge('startup_phase_seconds', 'Time spent in each startup phase', ['phase'])
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
 
 
-openai.api_key = os.getenv("OPENAI_API_KEY")
 def create_app():
     app = Flask(__name__)
     app.config.from_object(Config)
     CORS(app, resources={r"/*": {"origins": "*"}}, supports_credentials=True)
     db.init_app(app)
     jwt = JWTManager(app)
-    
+
+    # Independent of engine startup, so scripts that skip the engine (import_courses) still get the tables
     with app.app_context():
         db.create_all()
     Migrate(app, db)
     return app
 app = create_app()
 
-class RecommendationEngine:
-    def __init__(self):
-        self.data_lock = Lock()
-        self.available_courses_index = set()
-        self.cached_engagement_scores = {}
-        self.load_datasets()
-        self.cf_model = None
-        self.cbf_model = None
-        self.tfidf_vectorizer = None
-        self.load_or_train_models()
-    
-    def _create_sparse_matrix(self) -> csr_matrix:
-        """
-        Creates a sparse matrix for the user-item (student-course) engagement data.
-        """
-        try:
-            # Ensure the engagement data has the required columns
-            if not all(col in self.engagement.columns for col in ['student_id', 'course_id', 'rating']):
-                raise ValueError("Engagement data is missing required columns: 'student_id', 'course_id', 'rating'")
-
-            # Create a pivot table for the user-item matrix
-            user_item_df = self.engagement.pivot_table(
-                index='student_id', 
-                columns='course_id', 
-                values='rating', 
-                fill_value=0
-            )
-            
-            # Convert the pivot table to a sparse matrix
-            sparse_matrix = csr_matrix(user_item_df.values)
-            return sparse_matrix
-        except Exception as e:
-            logger.error(f"Error creating sparse matrix: {e}")
-            raise
-    def update_available_courses(self) -> None:
-        """
-        Updates the set of available courses based on the courses dataset.
-        """
-        try:
-            if 'course_id' in self.courses.columns:
-                self.available_courses_index = set(self.courses['course_id'])
-            else:
-                raise ValueError("Courses dataset is missing the required 'course_id' column")
-            logger.info("Available courses updated successfully")
-        except Exception as e:
-            logger.error(f"Error updating available courses: {e}")
-            raise
-
-
-    def load_datasets(self) -> None:
-        try:
-            self.students = pd.read_csv(students_path)
-            self.courses = pd.read_csv(courses_path )
-            self.engagement = pd.read_csv(engagement_path)
-            self.user_item_matrix = self._create_sparse_matrix()
-            self.update_available_courses()
-            logger.info("Datasets loaded successfully")
-        except Exception as e:
-            logger.error(f"Error loading datasets: {e}")
-            raise
-
-    def load_or_train_models(self) -> None:
-        os.makedirs('models', exist_ok=True)  # Ensure models/ directory exists
-        with MODEL_TRAINING_DURATION.time():
-            try:
-                if self._check_saved_models():
-                    self._load_saved_models()
-                else:
-                    self._train_new_models()
-            except Exception as e:
-                logger.error(f"Error in model initialization: {e}")
-                raise
-
-    def _train_new_models(self) -> None:
-        logger.info("Training new models...")
-        self.train_cf_model()
-        self.train_cbf_model()
-        self._save_models()
-
-    def train_cf_model(self) -> None:
-        reader = Reader(rating_scale=(1, 5))
-        data = Dataset.load_from_df(
-            self.engagement[['student_id', 'course_id', 'rating']], 
-            reader
-        )
-        trainset, _ = train_test_split(data, test_size=0.2)
-        self.cf_model = SVD(n_factors=100)
-        self.cf_model.fit(trainset)
-        logger.info("CF model trained successfully")
-
-    def train_cbf_model(self) -> None:
-        self.tfidf_vectorizer = TfidfVectorizer(stop_words='english')
-        course_features = self.tfidf_vectorizer.fit_transform(self.courses['features'])
-        self.cbf_model = cosine_similarity(course_features)
-        logger.info("CBF model trained successfully")
-
-    def _save_models(self) -> None:
-        joblib.dump(self.cf_model, 'models/cf_model.pk')
-        joblib.dump(self.tfidf_vectorizer, 'models/tfidf_vectorizer.pk')
-        joblib.dump(self.cbf_model, 'models/cbf_similarity_matrix.pk')
-        logger.info("Models saved successfully")
-
-    def _load_saved_models(self) -> None:
-        self.cf_model = joblib.load('models/cf_model.pk')
-        self.tfidf_vectorizer = joblib.load('models/tfidf_vectorizer.pk')
-        self.cbf_model = joblib.load('models/cbf_similarity_matrix.pk')
-        logger.info("Models loaded successfully")
-
-    def _check_saved_models(self) -> bool:
-        return os.path.exists('models/cf_model.pk') and os.path.exists('models/tfidf_vectorizer.pk') and os.path.exists('models/cbf_similarity_matrix.pk')
-
-async def get_hybrid_recommendations(self, student_id: int, n: int = 5) -> Dict[str, Union[List, float]]:
-    with RECOMMENDATION_LATENCY.time():
-        # Check if student has any interactions
-        student_interactions = self.engagement[self.engagement['student_id'] == student_id]
-        
-        if student_interactions.empty:
-            # New user - use cold start strategy
-            student = Student.query.get(student_id)
-            
-            # Get popular courses
-            popular_courses = self.engagement.groupby('course_id').agg({
-                'rating': ['count', 'mean']
-            }).sort_values(('rating', 'count'), ascending=False)
-            
-            # Get content-based recommendations using student profile
-            course_features = self.tfidf_vectorizer.transform(self.courses['features'])
-            student_profile = ' '.join(student.interests)
-            profile_vector = self.tfidf_vectorizer.transform([student_profile])
-            
-            content_similarities = cosine_similarity(profile_vector, course_features)[0]
-            
-            # Combine popularity and content-based scores
-            recommendations = []
-            for idx, course in self.courses.iterrows():
-                popularity_score = popular_courses.get(course['course_id'], (0, 0))[1]
-                content_score = content_similarities[idx]
-                
-                if course['difficulty'] <= student.skill_level:
-                    confidence = (0.6 * popularity_score) + (0.4 * content_score)
-                    recommendations.append({
-                        'course_id': course['course_id'],
-                        'course_name': course['course_name'],
-                        'confidence': float(confidence),
-                        'reason': 'Based on your interests and popular courses'
-                    })
-            
-            return {
-                'recommendations': sorted(recommendations, key=lambda x: x['confidence'], reverse=True)[:n],
-                'engagement_score': 0.0
-            }
-        
-        else:
-            # Existing user - use hybrid recommendations
-            normalized_engagement = self.normalize_engagement_score(student_id)
-            
-            cf_task = asyncio.to_thread(self.get_cf_recommendations, student_id, n)
-            cbf_task = asyncio.to_thread(self.get_cbf_recommendations, student_id, n)
-            
-            cf_recs, cbf_recs = await asyncio.gather(cf_task, cbf_task)
-            
-            hybrid_recs = self._combine_recommendations(
-                cf_recs, 
-                cbf_recs, 
-                normalized_engagement
-            )
-            
-            return {
-                'recommendations': sorted(hybrid_recs, key=lambda x: x['confidence'], reverse=True)[:n],
-                'engagement_score': normalized_engagement
-            }
+class EngineWarmup:
+    """
+    Tracks construction of the recommendation engine for the readiness probe.
+    """
 
-    async def log_interaction(self, interaction_data: Dict) -> None:
-        INTERACTION_COUNTER.inc()
-        with self.data_lock:
-            if self._validate_interaction(interaction_data):
-                self.engagement = pd.concat([
-                    self.engagement, 
-                    pd.DataFrame([interaction_data])
-                ], ignore_index=True)
-                self.engagement.to_csv('data/engagement.csv', index=False)
-                self.user_item_matrix = self._create_sparse_matrix()
-                self.cached_engagement_scores.pop(interaction_data['student_id'], None)
-                await self.update_engagement_metrics()
-
-    def calculate_engagement_metrics(self) -> Dict:
+    def __init__(self):
+        self.state = 'pending'
+        self.current_phase = None
+        self.timings: Dict[str, float] = {}
+        self.error = None
+        self._lock = Lock()
+
+    @contextmanager
+    def phase(self, name: str) -> Iterator[None]:
+        with self._lock:
+            self.current_phase = name
+        started = time.perf_counter()
         try:
-            overall_time = self.engagement.groupby(['course_id'])['time_spent'].mean()
-            avg_time_spent = self.engagement['time_spent'].mean()
-
-            # Calculate engagement score
-            self.engagement['engagement_score'] = (
-                0.4 * (self.engagement['time_spent'] / avg_time_spent) +
-                0.4 * (self.engagement['quiz_score'] / 100) +
-                0.2 * (self.engagement['rating'] / 5)
-            )
-
-            # Calculate content performance metrics
-            content_performance = pd.merge(
-                self.engagement,
-                self.courses[['course_id', 'content_type']],
-                on='course_id'
-            ).groupby('content_type').agg({
-                'quiz_score': 'mean',
-                'engagement_score': 'mean',
-                'time_spent': 'mean'
-            })
-
+            yield
+        finally:
+            elapsed = time.perf_counter() - started
+            with self._lock:
+                self.timings[name] = round(elapsed, 4)
+                self.current_phase = None
+            STARTUP_PHASE_DURATION.labels(phase=name).set(elapsed)
+            logger.info(f"Startup phase '{name}' took {elapsed:.3f}s")
+
+    def status(self) -> Dict:
+        with self._lock:
             return {
-                'overall_time': overall_time.to_dict(),
-                'content_performance': content_performance.to_dict(),
-                'avg_engagement_score': self.engagement['engagement_score'].mean()
+                'status': self.state,
+                'phase': self.current_phase,
+                'timings': dict(self.timings),
+                'error': self.error
             }
-        except Exception as e:
-            logger.error(f"Error calculating engagement metrics: {e}")
-            return {}
 
-    def calculate_engagement_score(self, student_id: int) -> float:
-        try:
-            student_engagement = self.engagement[self.engagement['student_id'] == student_id]
-            if student_engagement.empty:
-                logger.info(f"No engagement data found for student {student_id}")
-                return 0.0
-
-            time_score = student_engagement['time_spent'].sum() / self.courses['expected_time'].sum()
-            completion_score = student_engagement['completion_status'].mean()
-            quiz_score = student_engagement['quiz_score'].mean()
-
-            score = (0.4 * time_score + 0.3 * completion_score + 0.3 * quiz_score)
-            logger.info(f"Calculated engagement score for student {student_id}: {score:.2f}")
-            return score
-        except Exception as e:
-            logger.error(f"Error calculating engagement score for student {student_id}: {e}")
-            return 0.0
+warmup = EngineWarmup()
+engine = None
 
-    def normalize_engagement_score(self, student_id: int) -> float:
-        try:
-            # Calculate engagement scores for all students
-            scores = self.engagement.groupby('student_id').apply(
-                lambda df: self.calculate_engagement_score(df['student_id'].iloc[0])
-            )
-
-            # Normalize scores using MinMaxScaler
-            scaler = MinMaxScaler()
-            normalized_scores = scaler.fit_transform(scores.values.reshape(-1, 1))
-            normalized_score = dict(zip(scores.index, normalized_scores))[student_id]
-
-            return normalized_score
-        except Exception as e:
-            logger.error(f"Error normalizing engagement score for student {student_id}: {e}")
-            return 0.0
-
-
-    def get_student_progress(self, student_id: int) -> Dict:
-        student_data = self.engagement[self.engagement['student_id'] == student_id]
-        progress_metrics = {
-            'engagement_score': student_data['engagement_score'].mean(),
-            'quiz_performance': student_data['quiz_score'].mean(),
-            'preferred_content': self._get_preferred_content_type(student_id),
-            'completed_courses': len(student_data[student_data['completion_status'] == 1.0])
-        }
-        progress_metrics['ready_for_next'] = (
-            progress_metrics['engagement_score'] > 0.7 and 
-            progress_metrics['quiz_performance'] > 70
-        )
-        return progress_metrics
-
-    def _get_preferred_content_type(self, student_id: int) -> str:
-        student_performance = pd.merge(
-            self.engagement[self.engagement['student_id'] == student_id],
-            self.courses[['course_id', 'content_type']],
-            on='course_id'
-        )
-        return student_performance.groupby('content_type')['quiz_score'].mean().idxmax()
-
-    def update_engagement_metrics(self) -> None:
-        metrics = self.calculate_engagement_metrics()
-        ENGAGEMENT_SCORE_GAUGE.set(metrics['avg_engagement_score'])
-    def initialize_student_engagement(self,student_id):
-        try:
-            new_engagement = {'student_id': student_id, 'course_id': None, 'rating': 0}
-            self.engagement = self.engagement.append(new_engagement, ignore_index=True)
-            self.engagement.to_csv(engagement_path, index=False)
-            logger.info(f"Engagement initialized for student_id {student_id}")
-        except Exception as e:
-            logger.error(f"Error initializing engagement: {e}")
+def build_engine() -> None:
+    """
+    Builds the recommendation engine, deferring the heavy ML imports
+    (pandas, scipy, scikit-learn, surprise) until this point.
+    """
+    global engine
+    warmup.state = 'warming'
+    try:
+        with warmup.phase('total'):
+            with warmup.phase('imports'):
+                from recommendation_engine import RecommendationEngine
+            engine = RecommendationEngine(startup_phase=warmup.phase)
+        warmup.state = 'ready'
+    except Exception as e:
+        logger.error(f"Engine warm-up failed: {e}")
+        warmup.error = str(e)
+        warmup.state = 'failed'
+
+def is_serving_process() -> bool:
+    """
+    Whether this process will serve requests: not a Flask CLI command other
+    than `run`, not the reloader's watcher process, and not a worker process
+    spawned for retraining (which re-imports this module).
+    """
+    if multiprocessing.parent_process() is not None:
+        return False
+    if os.environ.get('FLASK_RUN_FROM_CLI') == 'true':
+        ctx = click.get_current_context(silent=True)
+        if ctx is None or ctx.command.name != 'run':
+            return False
+        reload = ctx.params.get('reload')
+        if reload is None:
+            reload = get_debug_flag()
+        return not reload or is_running_from_reloader()
+    if __name__ == '__main__':
+        # app.run(debug=True) below restarts the script under the reloader
+        return is_running_from_reloader()
+    return True
+
+def start_engine() -> None:
+    if Config.ENGINE_STARTUP == 'eager':
+        build_engine()
+    elif Config.ENGINE_STARTUP == 'background':
+        Thread(target=build_engine, name='engine-warmup', daemon=True).start()
+
+def requires_engine(fn):
+    @wraps(fn)
+    def wrapper(*args, **kwargs):
+        if warmup.state != 'ready':
+            return jsonify({'error': 'Recommendation engine is not ready', 'status': warmup.state}), 503
+        return current_app.ensure_sync(fn)(*args, **kwargs)
+    return wrapper
+
+@app.route('/healthz', methods=['GET'])
+def healthz():
+    return jsonify({'status': 'ok'})
+
+@app.route('/readyz', methods=['GET'])
+def readyz():
+    status = warmup.status()
+    return jsonify(status), 200 if status['status'] == 'ready' else 503
+
+@app.route('/metrics', methods=['GET'])
+def metrics():
+    # Scrapable during warmup too; engine gauges appear once it is ready
+    return Response(generate_latest(), content_type=CONTENT_TYPE_LATEST)
 
 @app.route('/train', methods=['POST'])
-async def train_models():
+@requires_engine
+async def schedule_training():
     try:
-        await engine.load_or_train_models()
-        return jsonify({"message": "Models trained successfully"})
+        engine.retrain_scheduler.trigger()
+        return jsonify({"message": "Model retraining scheduled"}), 202
     except Exception as e:
         logger.error(f"Training error: {e}")
         return jsonify({"error": str(e)}), 500
 
 @app.route('/recommendations/<int:student_id>', methods=['GET'])
+@requires_engine
 async def get_recommendations(student_id: int):
     try:
-        if student_id not in engine.students['student_id'].values:
+        with stage_timer('id_validation'):
+            valid = student_id in engine.valid_student_ids
+        if not valid:
             return jsonify({'error': 'Invalid student ID'}), 400
             
         result = await engine.get_hybrid_recommendations(student_id)
+        if result is None:
+            return jsonify({'error': 'Student profile not found'}), 404
+        with stage_timer('serialization'):
+            return jsonify({
+                'student_id': student_id,
+                'engagement_score': result['engagement_score'],
+                'recommendations': result['recommendations'],
+                'timestamp': datetime.now().isoformat()
+            })
+    except Exception as e:
+        logger.error(f"Recommendation error: {e}")
+        return jsonify({'error': 'Internal server error'}), 500
+
+@app.route('/recommendations/batch', methods=['POST'])
+@requires_engine
+def get_batch_recommendations():
+    data = request.get_json(silent=True) or {}
+    student_ids = data.get('student_ids')
+    n = data.get('n', 5)
+    if not isinstance(student_ids, list) or not all(isinstance(student_id, int) for student_id in student_ids):
+        return jsonify({'error': 'student_ids must be a list of integers'}), 400
+    if not isinstance(n, int) or n < 1:
+        return jsonify({'error': 'n must be a positive integer'}), 400
+
+    def generate():
+        with stage_timer('id_validation'):
+            known = [student_id in engine.valid_student_ids for student_id in student_ids]
+        valid_ids = []
+        for student_id, is_known in zip(student_ids, known):
+            if is_known:
+                valid_ids.append(student_id)
+            else:
+                yield json.dumps({'student_id': student_id, 'error': 'Invalid student ID'}) + '\n'
+
+        try:
+            for student_id, result in engine.iter_batch_recommendations(valid_ids, n):
+                if result is None:
+                    yield json.dumps({'student_id': student_id, 'error': 'Student profile not found'}) + '\n'
+                    continue
+                with stage_timer('serialization'):
+                    line = json.dumps({
+                        'student_id': student_id,
+                        'engagement_score': result['engagement_score'],
+                        'recommendations': result['recommendations']
+                    }) + '\n'
+                yield line
+        except Exception as e:
+            logger.error(f"Batch recommendation error: {e}")
+            yield json.dumps({'error': 'Internal server error'}) + '\n'
+
+    return Response(stream_with_context(generate()), mimetype='application/x-ndjson')
+
+@app.route('/courses/<int:course_id>/similar', methods=['GET'])
+@requires_engine
+async def get_similar_courses(course_id: int):
+    try:
+        if course_id not in engine.available_courses_index:
+            return jsonify({'error': 'Invalid course ID'}), 400
+
+        # Only CBF_NEIGHBOURS neighbours are kept per course, so a larger n can never be filled
+        n = request.args.get('n', default=10)
+        if not str(n).isdigit() or not 1 <= int(n) <= Config.CBF_NEIGHBOURS:
+            return jsonify({'error': f'n must be an integer between 1 and {Config.CBF_NEIGHBOURS}'}), 400
+        n = int(n)
         return jsonify({
-            'student_id': student_id,
-            'engagement_score': result['engagement_score'],
-            'recommendations': result['recommendations'],
+            'course_id': course_id,
+            'similar_courses': engine.get_similar_courses(course_id, n),
             'timestamp': datetime.now().isoformat()
         })
     except Exception as e:
-        logger.error(f"Recommendation error: {e}")
+        logger.error(f"Similar courses error: {e}")
+        return jsonify({'error': 'Internal server error'}), 500
+
+@app.route('/courses/catalog', methods=['PUT'])
+@requires_engine
+def update_catalog():
+    data = request.get_json(silent=True) or {}
+    courses = data.get('courses')
+    if not isinstance(courses, list) or not all(isinstance(course, dict) for course in courses):
+        return jsonify({'error': 'courses must be a list of objects'}), 400
+    for course in courses:
+        if not isinstance(course.get('course_id'), int):
+            return jsonify({'error': 'Every course needs an integer course_id'}), 400
+        missing = [
+            field for field in ('course_name', 'category_id', 'features', 'difficulty', 'average_time')
+            if course['course_id'] not in engine.available_courses_index and field not in course
+        ]
+        if missing:
+            return jsonify({'error': f"New course {course['course_id']} is missing {', '.join(missing)}"}), 400
+
+    try:
+        counts = engine.upsert_courses(courses)
+        return jsonify({**counts, 'model_version': engine.model_version})
+    except Exception as e:
+        logger.error(f"Catalog update error: {e}")
         return jsonify({'error': 'Internal server error'}), 500
 
+@app.route('/interactions', methods=['POST'])
+@requires_engine
+async def log_interaction():
+    data = request.get_json(silent=True)
+    if not isinstance(data, dict):
+        return jsonify({'error': 'Request body must be a JSON object'}), 400
+    try:
+        error = await engine.log_interaction(data)
+        if error is not None:
+            return jsonify({'error': error}), 400
+        # Accepted for the next micro-batch; not yet visible to reads
+        return jsonify({'status': 'queued'}), 202
+    except Full:
+        return jsonify({'error': 'Interaction queue is full'}), 503, {'Retry-After': '1'}
+    except Exception as e:
+        logger.error(f"Interaction logging error: {e}")
+        return jsonify({'error': 'Internal server error'}), 500
+
+@app.route('/interactions/bulk', methods=['POST'])
+@requires_engine
+def ingest_interactions():
+    # Imported here like the engine itself, once pandas is already loaded
+    from interaction_ingest import iter_csv_chunks, iter_ndjson_chunks
+    if request.mimetype == 'text/csv':
+        parse = iter_csv_chunks
+    elif request.mimetype in ('application/x-ndjson', 'application/jsonl'):
+        parse = iter_ndjson_chunks
+    else:
+        return jsonify({'error': 'Body must be NDJSON (application/x-ndjson) or CSV (text/csv)'}), 415
+
+    def generate():
+        # The body is read chunk by chunk while rejects are streamed back, one line each
+        accepted = rejected = 0
+        try:
+            for chunk, parse_rejects in parse(request.stream, Config.INGEST_CHUNK_SIZE):
+                errors = engine.ingest_interactions(chunk) if len(chunk) else {}
+                rejects = parse_rejects + [{'line': int(line), 'error': error} for line, error in errors.items()]
+                for reject in sorted(rejects, key=lambda reject: reject['line']):
+                    yield json.dumps(reject) + '\n'
+                accepted += len(chunk) - len(errors)
+                rejected += len(rejects)
+        except Exception as e:
+            logger.error(f"Bulk ingestion error: {e}")
+            yield json.dumps({'error': 'Internal server error'}) + '\n'
+        yield json.dumps({'accepted': accepted, 'rejected': rejected}) + '\n'
+
+    return Response(stream_with_context(generate()), mimetype='application/x-ndjson')
+
 @app.route('/metrics/engagement/<int:student_id>', methods=['GET'])
+@requires_engine
 async def get_engagement_metrics(student_id: int):
     try:
         progress = engine.get_student_progress(student_id)
+        if progress is None:
+            return jsonify({'error': 'Student not found'}), 404
         return jsonify({
             'student_id': student_id,
             'progress_metrics': progress,
@@ -393,6 +339,7 @@ async def get_engagement_metrics(student_id: int):
         return jsonify({'error': 'Internal server error'}), 500
 
 @app.route('/metrics/content-performance', methods=['GET'])
+@requires_engine
 async def get_content_performance():
     try:
         metrics = engine.calculate_engagement_metrics()
@@ -442,6 +389,9 @@ def register_student():
         db.session.add(new_student)
         db.session.add(profile)
         db.session.commit()
+        if engine is not None:
+            # Lets the new student's events and recommendation requests pass the known-student checks
+            engine.valid_student_ids.add(new_student.id)
         
         # Generate JWT token
         access_token = create_access_token(
@@ -510,6 +460,9 @@ def get_courses():
     } for course in courses])
 @app.route('/api/chat', methods=['POST'])
 def chat():
+    # Imported on first use so the client library stays off the startup path
+    import openai
+
     message = request.json.get('message')
 
     if not message:
@@ -520,7 +473,7 @@ def chat():
 
     for attempt in range(retries):
         try:
-            client = openai.OpenAI(api_key=openai.api_key)
+            client = openai.OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
             response = client.chat.completions.create(
                 model="gpt-3.5-turbo",
                 messages=[
@@ -550,11 +503,12 @@ def get_dashboard():
 
 @app.route('/api/dashboard/overview/<int:student_id>', methods=['GET'])
 @jwt_required()
-def get_dashboard_overview(student_id):
+@requires_engine
+async def get_dashboard_overview(student_id):
     try:
         student = Student.query.get_or_404(student_id)
         progress = engine.get_student_progress(student_id)
-        recommendations = engine.get_hybrid_recommendations(student_id, n=3)
+        recommendations = await engine.get_hybrid_recommendations(student_id, n=3)
         
         return jsonify({
             'streak_days': student.streak_days,
@@ -708,8 +662,10 @@ def handle_learning_goals(student_id):
         logger.error(f"Error handling learning goals: {e}")
         return jsonify({'error': 'Internal server error'}), 500
 
+if is_serving_process():
+    start_engine()
+
 if __name__ == '__main__':
-    engine = RecommendationEngine()
     app.run(debug=True)
 
 
@@ -0,0 +1,219 @@
+from itertools import islice
+from typing import Dict, Hashable, Iterable, Optional, Sequence, Tuple
+import copy
+import numpy as np
+
+
+class FactorScorer:
+    """
+    Matrix-form scorer over the factors of a trained SVD model.
+
+    The user/item factor matrices, biases and global mean are held as float32
+    arrays, with items aligned to the catalog order, so scoring any number of
+    students against every course is a single matrix multiply:
+
+        est = mu + b_u + b_i + p_u . q_i, clipped to the rating scale
+
+    Students or courses the model never saw fall back to the same estimate
+    surprise itself gives them (their factor and bias terms are dropped).
+    The arrays may be read-only memory maps shared between processes, so
+    online updates from fold_in are kept in small per-student and per-course
+    override tables that are applied on top of them at scoring time. A
+    published scorer is not changed: writers fold into a `copy`, which has
+    its own override tables and shares everything else.
+    """
+
+    def __init__(self, global_mean: float, rating_scale: Tuple[float, float], user_ids: np.ndarray,
+                 user_factors: np.ndarray, user_bias: np.ndarray, course_ids: np.ndarray,
+                 item_factors: np.ndarray, item_bias: np.ndarray):
+        self.global_mean = np.float32(global_mean)
+        self.rating_scale = tuple(rating_scale)
+        self.user_ids = user_ids
+        self.user_factors = user_factors
+        self.user_bias = user_bias
+        self.course_ids = course_ids
+        self.item_factors = item_factors
+        self.item_bias = item_bias
+        self.user_index: Dict[Hashable, int] = {user_id: row for row, user_id in enumerate(user_ids.tolist())}
+        self._user_overrides: Dict[Hashable, Tuple[np.ndarray, np.float32]] = {}
+        self._item_overrides: Dict[int, Tuple[np.ndarray, np.float32]] = {}
+
+    @classmethod
+    def from_svd(cls, cf_model, course_ids: Sequence[Hashable]) -> "FactorScorer":
+        trainset = cf_model.trainset
+        user_ids = np.array([trainset.to_raw_uid(inner_id) for inner_id in trainset.all_users()])
+
+        n_factors = cf_model.pu.shape[1]
+        item_factors = np.zeros((len(course_ids), n_factors), dtype=np.float32)
+        item_bias = np.zeros(len(course_ids), dtype=np.float32)
+        for position, course_id in enumerate(course_ids):
+            try:
+                inner_id = trainset.to_inner_iid(course_id)
+            except ValueError:
+                continue
+            item_factors[position] = cf_model.qi[inner_id]
+            item_bias[position] = cf_model.bi[inner_id]
+
+        return cls(
+            global_mean=trainset.global_mean,
+            rating_scale=trainset.rating_scale,
+            user_ids=user_ids,
+            user_factors=np.asarray(cf_model.pu, dtype=np.float32),
+            user_bias=np.asarray(cf_model.bu, dtype=np.float32),
+            course_ids=np.asarray(course_ids),
+            item_factors=item_factors,
+            item_bias=item_bias
+        )
+
+    def with_catalog(self, course_ids: Sequence[Hashable]) -> "FactorScorer":
+        """
+        Returns a scorer for a catalog that extends this one with new courses
+        appended at the end. New courses start with zero factors and bias, as
+        if the model had never seen them, and the online overrides carry over.
+        """
+        n_courses, n_factors = len(course_ids), self.item_factors.shape[1]
+        item_factors = np.zeros((n_courses, n_factors), dtype=np.float32)
+        item_bias = np.zeros(n_courses, dtype=np.float32)
+        item_factors[:len(self.item_factors)] = self.item_factors
+        item_bias[:len(self.item_bias)] = self.item_bias
+
+        scorer = FactorScorer(
+            global_mean=self.global_mean,
+            rating_scale=self.rating_scale,
+            user_ids=self.user_ids,
+            user_factors=self.user_factors,
+            user_bias=self.user_bias,
+            course_ids=np.asarray(course_ids),
+            item_factors=item_factors,
+            item_bias=item_bias
+        )
+        scorer.user_index = self.user_index
+        scorer._user_overrides = dict(self._user_overrides)
+        scorer._item_overrides = dict(self._item_overrides)
+        return scorer
+
+    def copy(self) -> "FactorScorer":
+        scorer = copy.copy(self)
+        scorer._user_overrides = dict(self._user_overrides)
+        scorer._item_overrides = dict(self._item_overrides)
+        return scorer
+
+    def score(self, student_ids: Iterable[Hashable]) -> np.ndarray:
+        """
+        Returns a (students x catalog) float32 matrix of estimated ratings.
+        """
+        student_ids = list(student_ids)
+        rows = np.array([self.user_index.get(student_id, -1) for student_id in student_ids], dtype=np.int64)
+        known = rows >= 0
+
+        user_factors = np.zeros((len(rows), self.item_factors.shape[1]), dtype=np.float32)
+        user_bias = np.zeros(len(rows), dtype=np.float32)
+        user_factors[known] = self.user_factors[rows[known]]
+        user_bias[known] = self.user_bias[rows[known]]
+        for row, student_id in enumerate(student_ids):
+            override = self._user_overrides.get(student_id)
+            if override is not None:
+                user_factors[row], user_bias[row] = override
+
+        estimates = user_factors @ self.item_factors.T
+        estimates += self.global_mean + user_bias[:, None] + self.item_bias[None, :]
+
+        item_overrides = self._item_overrides
+        if item_overrides:
+            positions = np.fromiter(item_overrides.keys(), dtype=np.int64, count=len(item_overrides))
+            item_vectors = np.stack([vector for vector, _ in item_overrides.values()])
+            item_bias = np.array([bias for _, bias in item_overrides.values()], dtype=np.float32)
+            estimates[:, positions] = user_factors @ item_vectors.T + self.global_mean + user_bias[:, None] + item_bias[None, :]
+        return np.clip(estimates, *self.rating_scale, out=estimates)
+
+    def fold_in(self, student_ids: Sequence[Hashable], positions: Sequence[Sequence[int]],
+                ratings: Sequence[Sequence[float]], regularization: float = 0.02,
+                update_item_bias: bool = False, max_overrides: Optional[int] = None) -> None:
+        """
+        Refits a batch of students' factor vectors and biases against their
+        ratings (`positions[i]`, `ratings[i]` for `student_ids[i]`), holding
+        item factors fixed. Each student's (p_u, b_u) is the ridge regression
+        of r - mu - b_i on [q_i, 1] with penalty regularization * n_u, solved
+        in closed form for the whole batch with one stacked solve.
+
+        Courses the model has never seen have no factors to regress on; their
+        bias (with update_item_bias, every rated course's bias) first moves to
+        the shrunk mean residual of the batch's ratings of them, so repeated
+        batches converge on the course's mean offset.
+
+        At most `max_overrides` students keep an override; the ones folded in
+        least recently fall back to their trained factors.
+        """
+        batch = [index for index, student_positions in enumerate(positions) if len(student_positions)]
+        if not batch:
+            return
+        student_ids = [student_ids[index] for index in batch]
+        lengths = np.array([len(positions[index]) for index in batch], dtype=np.int64)
+        row_positions = np.concatenate([np.asarray(positions[index], dtype=np.int64) for index in batch])
+        row_ratings = np.concatenate([np.asarray(ratings[index], dtype=np.float64) for index in batch])
+        owners = np.repeat(np.arange(len(batch)), lengths)
+
+        items, item_rows = np.unique(row_positions, return_inverse=True)
+        item_vectors = np.array(self.item_factors[items], dtype=np.float64)
+        item_bias = np.array(self.item_bias[items], dtype=np.float64)
+        # A trained item never ends up with an exactly zero factor vector
+        new_items = ~np.any(item_vectors != 0, axis=1) & (item_bias == 0)
+        for index, position in enumerate(items.tolist()):
+            override = self._item_overrides.get(position)
+            if override is not None:
+                item_vectors[index], item_bias[index] = override
+
+        updated_items = np.ones(len(items), dtype=bool) if update_item_bias else new_items
+        if updated_items.any():
+            user_vectors, user_bias = self._user_state(student_ids)
+            residuals = row_ratings - (
+                self.global_mean + user_bias[owners] + item_bias[item_rows] +
+                np.einsum('ij,ij->i', user_vectors[owners], item_vectors[item_rows])
+            )
+            sums = np.bincount(item_rows, weights=residuals, minlength=len(items))
+            counts = np.bincount(item_rows, minlength=len(items))
+            item_bias[updated_items] += sums[updated_items] / (counts[updated_items] * (1 + regularization))
+
+        n_terms = item_vectors.shape[1] + 1
+        features = np.empty((len(row_positions), n_terms))
+        features[:, :-1] = item_vectors[item_rows]
+        features[:, -1] = 1
+        targets = row_ratings - self.global_mean - item_bias[item_rows]
+        grams = np.empty((len(batch), n_terms, n_terms))
+        moments = np.empty((len(batch), n_terms))
+        bounds = np.concatenate([[0], np.cumsum(lengths)])
+        for student in range(len(batch)):
+            student_features = features[bounds[student]:bounds[student + 1]]
+            grams[student] = student_features.T @ student_features
+            moments[student] = student_features.T @ targets[bounds[student]:bounds[student + 1]]
+        diagonal = np.arange(n_terms)
+        grams[:, diagonal, diagonal] += regularization * lengths[:, None]
+        solutions = np.linalg.solve(grams, moments[:, :, None])[:, :, 0].astype(np.float32)
+
+        for student, student_id in enumerate(student_ids):
+            # Reinserted so the dict stays ordered by last fold-in
+            self._user_overrides.pop(student_id, None)
+            self._user_overrides[student_id] = (solutions[student, :-1], solutions[student, -1])
+        if max_overrides is not None:
+            for student_id in list(islice(self._user_overrides, max(len(self._user_overrides) - max_overrides, 0))):
+                del self._user_overrides[student_id]
+        for index in np.flatnonzero(updated_items):
+            self._item_overrides[int(items[index])] = (
+                item_vectors[index].astype(np.float32), np.float32(item_bias[index])
+            )
+
+    def _user_state(self, student_ids: Sequence[Hashable]) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Returns the students' current factor vectors and biases; students the
+        model has never seen start at zero.
+        """
+        user_vectors = np.zeros((len(student_ids), self.item_factors.shape[1]))
+        user_bias = np.zeros(len(student_ids))
+        for row, student_id in enumerate(student_ids):
+            override = self._user_overrides.get(student_id)
+            if override is not None:
+                user_vectors[row], user_bias[row] = override
+            elif student_id in self.user_index:
+                user_vectors[row] = self.user_factors[self.user_index[student_id]]
+                user_bias[row] = self.user_bias[self.user_index[student_id]]
+        return user_vectors, user_bias
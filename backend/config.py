@@ -7,3 +7,35 @@ class Config:
     SQLALCHEMY_DATABASE_URI = os.getenv("DATABASE_URL")
     SQLALCHEMY_TRACK_MODIFICATIONS = False
     JWT_SECRET_KEY = os.getenv("JWT_SECRET")
+    RECOMMENDATION_CACHE_SIZE = int(os.getenv("RECOMMENDATION_CACHE_SIZE", 10000))
+    RECOMMENDATION_CACHE_TTL = float(os.getenv("RECOMMENDATION_CACHE_TTL", 300))
+    ENGAGEMENT_LOG_FSYNC_BATCH = int(os.getenv("ENGAGEMENT_LOG_FSYNC_BATCH", 64))
+    ENGAGEMENT_LOG_FSYNC_INTERVAL = float(os.getenv("ENGAGEMENT_LOG_FSYNC_INTERVAL", 1))
+    ENGAGEMENT_LOG_COMPACTION_INTERVAL = float(os.getenv("ENGAGEMENT_LOG_COMPACTION_INTERVAL", 3600))
+    ENGAGEMENT_LOG_MAX_STORE_ATTEMPTS = int(os.getenv("ENGAGEMENT_LOG_MAX_STORE_ATTEMPTS", 5))
+    CBF_NEIGHBOURS = int(os.getenv("CBF_NEIGHBOURS", 50))
+    CBF_BLOCK_SIZE = int(os.getenv("CBF_BLOCK_SIZE", 256))
+    INTERACTION_QUEUE_SIZE = int(os.getenv("INTERACTION_QUEUE_SIZE", 10000))
+    INTERACTION_BATCH_SIZE = int(os.getenv("INTERACTION_BATCH_SIZE", 500))
+    INTERACTION_BATCH_DELAY = float(os.getenv("INTERACTION_BATCH_DELAY", 0.05))
+    INTERACTION_QUEUE_TIMEOUT = float(os.getenv("INTERACTION_QUEUE_TIMEOUT", 0.5))
+    INGEST_CHUNK_SIZE = int(os.getenv("INGEST_CHUNK_SIZE", 10000))
+    RECOMMENDATION_BATCH_CHUNK = int(os.getenv("RECOMMENDATION_BATCH_CHUNK", 512))
+    RECOMMENDATION_WORKERS = int(os.getenv("RECOMMENDATION_WORKERS", os.cpu_count() or 4))
+    CF_FACTORS = int(os.getenv("CF_FACTORS", 100))
+    RETRAIN_INTERVAL = float(os.getenv("RETRAIN_INTERVAL", 86400))
+    RETRAIN_INTERACTION_THRESHOLD = int(os.getenv("RETRAIN_INTERACTION_THRESHOLD", 1000))
+    RETRAIN_CATALOG_THRESHOLD = int(os.getenv("RETRAIN_CATALOG_THRESHOLD", 100))
+    MODEL_REGISTRY_KEEP = int(os.getenv("MODEL_REGISTRY_KEEP", 3))
+    MODEL_RELOAD_INTERVAL = float(os.getenv("MODEL_RELOAD_INTERVAL", 30))
+    ENGAGEMENT_AGGREGATES_REFRESH_INTERVAL = float(os.getenv("ENGAGEMENT_AGGREGATES_REFRESH_INTERVAL", 3600))
+    DATASET_FORMAT = os.getenv("DATASET_FORMAT", "feather")  # feather, parquet or csv
+    DATASET_SOURCE = os.getenv("DATASET_SOURCE", "files")  # files or database
+    DATABASE_CHUNK_SIZE = int(os.getenv("DATABASE_CHUNK_SIZE", 10000))
+    ENGAGEMENT_SYNC_INTERVAL = float(os.getenv("ENGAGEMENT_SYNC_INTERVAL", 1))
+    ENGAGEMENT_SYNC_BATCH = int(os.getenv("ENGAGEMENT_SYNC_BATCH", 10000))
+    ENGAGEMENT_SYNC_GAP_TIMEOUT = float(os.getenv("ENGAGEMENT_SYNC_GAP_TIMEOUT", 60))
+    ENGINE_STARTUP = os.getenv("ENGINE_STARTUP", "background")  # background, eager or off
+    CF_FOLD_IN_REGULARIZATION = float(os.getenv("CF_FOLD_IN_REGULARIZATION", 0.02))
+    CF_FOLD_IN_MAX_OVERRIDES = int(os.getenv("CF_FOLD_IN_MAX_OVERRIDES", 100000))
+    CF_FOLD_IN_ITEM_BIAS = os.getenv("CF_FOLD_IN_ITEM_BIAS", "false").lower() == "true"
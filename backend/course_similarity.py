@@ -0,0 +1,106 @@
+from typing import Sequence, Tuple
+import numpy as np
+from scipy.sparse import csr_matrix
+
+
+def top_k_neighbours(query: csr_matrix, features: csr_matrix, k: int,
+                     query_positions: Sequence[int]) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Finds the k most similar rows of `features` for each row of `query`.
+
+    `query_positions` gives each query row's own position in `features` (or -1)
+    so a course is never its own neighbour. Returns (query row, neighbour
+    position, similarity) triples; pairs with no overlap at all are dropped.
+    """
+    similarities = (query @ features.T).toarray()
+    query_positions = np.asarray(query_positions)
+    own = query_positions >= 0
+    similarities[np.flatnonzero(own), query_positions[own]] = -np.inf
+    k = min(k, features.shape[0] - 1 if own.any() else features.shape[0])
+    if k <= 0:
+        empty = np.empty(0, dtype=np.int64)
+        return empty, empty, np.empty(0, dtype=np.float32)
+
+    neighbours = np.argpartition(similarities, -k, axis=1)[:, -k:]
+    neighbour_scores = np.take_along_axis(similarities, neighbours, axis=1)
+    keep = neighbour_scores > 0
+    return np.nonzero(keep)[0], neighbours[keep], neighbour_scores[keep]
+
+
+def top_k_similarity_graph(features: csr_matrix, k: int = 50, block_size: int = 256) -> csr_matrix:
+    """
+    Builds a CSR graph holding each course's k most similar courses.
+
+    `features` must have L2-normalized rows (as TfidfVectorizer produces), so
+    the dot product is the cosine similarity. Similarities are computed one
+    block of rows at a time, which bounds peak memory to block_size x n
+    instead of n x n. A course is never its own neighbour, and pairs with no
+    overlap at all are not stored.
+    """
+    features = csr_matrix(features, dtype=np.float32)
+    n_courses = features.shape[0]
+
+    rows, cols, values = [], [], []
+    for start in range(0, n_courses, block_size):
+        stop = min(start + block_size, n_courses)
+        block_rows, block_cols, block_values = top_k_neighbours(
+            features[start:stop], features, k, np.arange(start, stop)
+        )
+        rows.append(block_rows + start)
+        cols.append(block_cols)
+        values.append(block_values)
+
+    if not rows:
+        return csr_matrix((n_courses, n_courses), dtype=np.float32)
+    return csr_matrix(
+        (np.concatenate(values).astype(np.float32), (np.concatenate(rows), np.concatenate(cols))),
+        shape=(n_courses, n_courses)
+    )
+
+
+def replace_rows(matrix: csr_matrix, positions: Sequence[int], rows: csr_matrix, n_rows: int) -> csr_matrix:
+    """
+    Returns a copy of `matrix` grown to `n_rows` rows, with the rows at
+    `positions` replaced by the rows of `rows`.
+    """
+    positions = np.asarray(positions, dtype=np.int64)
+    base = matrix.tocoo()
+    update = rows.tocoo()
+    stale = np.isin(base.row, positions)
+    return csr_matrix(
+        (
+            np.concatenate([base.data[~stale], update.data]),
+            (np.concatenate([base.row[~stale], positions[update.row]]), np.concatenate([base.col[~stale], update.col]))
+        ),
+        shape=(n_rows, max(matrix.shape[1], rows.shape[1]))
+    )
+
+
+def update_similarity_graph(graph: csr_matrix, features: csr_matrix, positions: Sequence[int],
+                            k: int = 50, block_size: int = 256) -> csr_matrix:
+    """
+    Returns a copy of `graph`, grown to match `features`, in which the rows at
+    `positions` (new or edited courses) are recomputed against the full
+    catalog. Each row costs one sparse product with the catalog, so an update
+    is O(catalog) per changed course. Rows of untouched courses are left as
+    they are, so they only start listing the new courses after a full rebuild.
+    """
+    features = csr_matrix(features, dtype=np.float32)
+    n_courses = features.shape[0]
+    positions = np.asarray(positions, dtype=np.int64)
+
+    rows, cols, values = [], [], []
+    for start in range(0, len(positions), block_size):
+        block = positions[start:start + block_size]
+        block_rows, block_cols, block_values = top_k_neighbours(features[block], features, k, block)
+        rows.append(block_rows + start)
+        cols.append(block_cols)
+        values.append(block_values)
+
+    if not rows:
+        return replace_rows(graph, positions, csr_matrix((0, n_courses), dtype=np.float32), n_courses)
+    neighbours = csr_matrix(
+        (np.concatenate(values).astype(np.float32), (np.concatenate(rows), np.concatenate(cols))),
+        shape=(len(positions), n_courses)
+    )
+    return replace_rows(graph, positions, neighbours, n_courses)
@@ -0,0 +1,161 @@
+from typing import Dict, List, Optional
+import argparse
+import fcntl
+import logging
+import os
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+# Explicit column types, so no load has to infer them from text
+SCHEMAS: Dict[str, Dict[str, object]] = {
+    'students': {
+        'student_id': 'int32',
+        'full_name': str,
+        'email': str,
+        'skill_level': 'category',
+        'registration_date': str,
+        'interests': str,
+        'preferences': str,
+        'active_status': 'float32',
+        'password': str,
+        'preferred_categories': str
+    },
+    'courses': {
+        'course_id': 'int32',
+        'course_name': str,
+        'category_id': 'Int32',
+        'content_type': str,
+        'difficulty': str,
+        'rating': 'float32',
+        'average_time': 'float32',
+        'features': str
+    },
+    'engagement': {
+        'student_id': 'int32',
+        # Nullable: a newly registered student is recorded with no course
+        'course_id': 'Int32',
+        'course_name': 'category',
+        'time_spent': 'float32',
+        'quiz_score': 'float32',
+        'completion_status': 'float32',
+        'rating': 'float32'
+    }
+}
+FORMATS = ('csv', 'feather', 'parquet')
+
+
+def dataset_path(csv_path: str, snapshot_format: str) -> str:
+    """
+    Returns where the snapshot of the dataset exported at `csv_path` lives in the given format.
+    """
+    return os.path.splitext(csv_path)[0] + '.' + snapshot_format
+
+
+def _format_of(path: str) -> str:
+    snapshot_format = os.path.splitext(path)[1].lstrip('.').lower()
+    if snapshot_format not in FORMATS:
+        raise ValueError(f"Unsupported dataset format: {path}")
+    return snapshot_format
+
+
+def apply_schema(frame: pd.DataFrame, name: str) -> pd.DataFrame:
+    schema = SCHEMAS[name]
+    return frame.astype({column: dtype for column, dtype in schema.items() if column in frame.columns})
+
+
+def read_frame(path: str, name: str, columns: Optional[List[str]] = None) -> pd.DataFrame:
+    """
+    Reads one dataset file with the dataset's schema applied.
+
+    Only `columns` are read when given. Feather files are memory-mapped, so
+    numeric columns without nulls are handed to pandas without a copy.
+    """
+    snapshot_format = _format_of(path)
+    if snapshot_format == 'csv':
+        schema = SCHEMAS[name]
+        # Parse every column as the type it ends up as, instead of inferring and converting
+        frame = pd.read_csv(
+            path,
+            usecols=columns,
+            dtype={column: dtype for column, dtype in schema.items() if dtype != 'category'}
+        )
+        return apply_schema(frame, name)
+
+    import pyarrow as pa
+    if snapshot_format == 'feather':
+        with pa.memory_map(path, 'r') as source:
+            table = pa.ipc.open_file(source).read_all()
+        if columns is not None:
+            table = table.select(columns)
+    else:
+        import pyarrow.parquet as pq
+        table = pq.read_table(path, columns=columns, memory_map=True)
+    return apply_schema(table.to_pandas(split_blocks=True), name)
+
+
+def write_frame(frame: pd.DataFrame, path: str, name: str) -> None:
+    """
+    Writes a dataset file with the dataset's schema applied. The file is
+    written aside and renamed into place, so readers never see a partial file.
+    """
+    snapshot_format = _format_of(path)
+    frame = apply_schema(frame, name).reset_index(drop=True)
+    tmp_path = path + '.tmp'
+    if snapshot_format == 'csv':
+        frame.to_csv(tmp_path, index=False)
+    elif snapshot_format == 'feather':
+        # Uncompressed, so the file can be memory-mapped on load
+        frame.to_feather(tmp_path, compression='uncompressed')
+    else:
+        frame.to_parquet(tmp_path, index=False)
+    with open(tmp_path, 'rb') as written:
+        os.fsync(written.fileno())
+    os.replace(tmp_path, path)
+
+
+def upsert_rows(rows: pd.DataFrame, path: str, name: str, key: str) -> None:
+    """
+    Replaces the rows of a dataset file whose `key` is in `rows` and appends
+    the others, keeping the file's row order. The file is re-read and
+    rewritten under an exclusive lock on a lock file beside it, so processes
+    sharing the file do not overwrite each other's rows.
+    """
+    with open(path + '.lock', 'a') as lock_file:
+        fcntl.flock(lock_file, fcntl.LOCK_EX)
+        current = read_frame(path, name) if os.path.exists(path) else rows.iloc[:0]
+        combined = pd.concat([current, rows], ignore_index=True)
+        latest = combined.drop_duplicates(subset=key, keep='last').set_index(key, drop=False)
+        write_frame(latest.loc[combined[key].drop_duplicates()], path, name)
+
+
+def load_dataset(csv_path: str, name: str, snapshot_format: str, columns: Optional[List[str]] = None) -> pd.DataFrame:
+    """
+    Loads a dataset from its columnar snapshot, building the snapshot from
+    the CSV export first if it does not exist yet. Once it exists the
+    snapshot is the dataset (compaction folds logged engagement into it), so
+    a later CSV is only picked up by converting it explicitly with this
+    module's command line.
+    """
+    if snapshot_format == 'csv':
+        return read_frame(csv_path, name, columns)
+
+    path = dataset_path(csv_path, snapshot_format)
+    if not os.path.exists(path) and os.path.exists(csv_path):
+        logger.info(f"Converting {csv_path} to a {snapshot_format} snapshot")
+        write_frame(read_frame(csv_path, name), path, name)
+    return read_frame(path, name, columns)
+
+
+def convert(source: str, destination: str, name: str) -> None:
+    write_frame(read_frame(source, name), destination, name)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Convert engine datasets between CSV, Feather and Parquet.')
+    parser.add_argument('dataset', choices=sorted(SCHEMAS), help='which dataset the files hold')
+    parser.add_argument('source', help='file to read; the format is taken from the extension')
+    parser.add_argument('destination', help='file to write; the format is taken from the extension')
+    args = parser.parse_args()
+    convert(args.source, args.destination, args.dataset)
+    print(f'Converted {args.source} to {args.destination}')
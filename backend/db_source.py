@@ -0,0 +1,96 @@
+from typing import Callable, Iterator, List, Optional
+import logging
+import pandas as pd
+from sqlalchemy import Table, insert, select, update
+from sqlalchemy.engine import Engine
+from sqlalchemy.sql import Select
+from dataset_store import apply_schema
+from models import Course, Engagement, Student
+
+logger = logging.getLogger(__name__)
+
+COURSE_COLUMNS = (
+    Course.course_id, Course.course_name, Course.category_id, Course.content_type,
+    Course.difficulty, Course.rating, Course.average_time, Course.features
+)
+ENGAGEMENT_COLUMNS = (
+    Engagement.student_id, Engagement.course_id, Engagement.time_spent,
+    Engagement.quiz_score, Engagement.completion_status, Engagement.rating
+)
+
+
+def stream_query(sql_engine: Engine, statement: Select, chunk_size: int) -> Iterator[pd.DataFrame]:
+    """
+    Runs `statement` on a server-side cursor and yields its rows as
+    DataFrames of at most `chunk_size` rows. Only one chunk of rows is ever
+    held in Python at a time; no ORM objects are built.
+    """
+    with sql_engine.connect() as connection:
+        result = connection.execution_options(stream_results=True, yield_per=chunk_size).execute(statement)
+        columns = list(result.keys())
+        for rows in result.partitions():
+            yield pd.DataFrame.from_records(rows, columns=columns)
+
+
+def stream_engagement(sql_engine: Engine, chunk_size: int) -> Iterator[pd.DataFrame]:
+    # The row id is included so callers can track how far they have read
+    statement = select(Engagement.id, *ENGAGEMENT_COLUMNS).order_by(Engagement.id)
+    for chunk in stream_query(sql_engine, statement, chunk_size):
+        yield apply_schema(chunk, 'engagement')
+
+
+def load_courses(sql_engine: Engine, chunk_size: int) -> pd.DataFrame:
+    # Ordered by id so catalog positions (and the models aligned to them) are stable across loads
+    statement = select(*COURSE_COLUMNS).order_by(Course.course_id)
+    chunks = list(stream_query(sql_engine, statement, chunk_size))
+    courses = pd.concat(chunks, ignore_index=True) if chunks else pd.DataFrame(columns=[c.name for c in COURSE_COLUMNS])
+    return apply_schema(courses, 'courses')
+
+
+def load_students(sql_engine: Engine, chunk_size: int) -> pd.DataFrame:
+    statement = select(Student.id.label('student_id')).order_by(Student.id)
+    chunks = list(stream_query(sql_engine, statement, chunk_size))
+    students = pd.concat(chunks, ignore_index=True) if chunks else pd.DataFrame(columns=['student_id'])
+    return apply_schema(students, 'students')
+
+
+def insert_engagement(sql_engine: Engine, engagement: pd.DataFrame,
+                      on_inserted: Optional[Callable[[List[int]], None]] = None) -> None:
+    """
+    Inserts logged engagement events into the engagements table. Events
+    without a course (registration markers) have no row there and are skipped.
+    `on_inserted` receives the new row ids before the transaction commits.
+    """
+    engagement = engagement.dropna(subset=['course_id'])
+    columns = [column.name for column in ENGAGEMENT_COLUMNS if column.name in engagement.columns]
+    records = engagement[columns].astype(object).where(engagement[columns].notna(), None).to_dict('records')
+    if records:
+        with sql_engine.begin() as connection:
+            ids = connection.execute(insert(Engagement.__table__).returning(Engagement.id), records).scalars().all()
+            if on_inserted is not None:
+                on_inserted(ids)
+    logger.info(f"Inserted {len(records)} engagement events into the database")
+
+
+def insert_frame(sql_engine: Engine, table: Table, frame: pd.DataFrame) -> None:
+    """
+    Bulk-inserts the rows of `frame` into `table` in one transaction. Only
+    columns the table has are written; missing values become NULL.
+    """
+    columns = [column for column in frame.columns if column in table.columns]
+    records = frame[columns].astype(object).where(frame[columns].notna(), None).to_dict('records')
+    if records:
+        with sql_engine.begin() as connection:
+            connection.execute(insert(table), records)
+
+
+def upsert_courses(sql_engine: Engine, courses: pd.DataFrame) -> None:
+    columns = [column.name for column in COURSE_COLUMNS if column.name in courses.columns]
+    records = courses[columns].astype(object).where(courses[columns].notna(), None).to_dict('records')
+    with sql_engine.begin() as connection:
+        for record in records:
+            updated = connection.execute(
+                update(Course.__table__).where(Course.course_id == record['course_id']).values(**record)
+            )
+            if updated.rowcount == 0:
+                connection.execute(insert(Course.__table__).values(**record))
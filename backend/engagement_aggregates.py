@@ -0,0 +1,485 @@
+from typing import Dict, Hashable, List, Optional, Tuple
+import numpy as np
+import pandas as pd
+
+
+class _RowBlocks:
+    """
+    A float table of fixed-width rows, stored in blocks of BLOCK_ROWS rows.
+
+    `copy` shares every block with the original, and neither side writes a
+    shared block in place: the first write to one replaces it with a private
+    copy. Updating a copy therefore costs the blocks the update touches, not
+    the whole table. Rows past the last write read as zeros.
+    """
+
+    BLOCK_ROWS = 1024
+
+    def __init__(self, width: int):
+        self.width = width
+        self._blocks: List[np.ndarray] = []
+        self._owned = set()
+
+    @classmethod
+    def from_array(cls, array: np.ndarray) -> "_RowBlocks":
+        table = cls(array.shape[1])
+        table.grow(len(array))
+        for block_id, block in enumerate(table._blocks):
+            rows = array[block_id * cls.BLOCK_ROWS:(block_id + 1) * cls.BLOCK_ROWS]
+            block[:len(rows)] = rows
+        return table
+
+    def __len__(self) -> int:
+        return len(self._blocks) * self.BLOCK_ROWS
+
+    def copy(self) -> "_RowBlocks":
+        table = _RowBlocks(self.width)
+        table._blocks = list(self._blocks)
+        self._owned = set()
+        return table
+
+    def grow(self, size: int) -> None:
+        while len(self) < size:
+            self._owned.add(len(self._blocks))
+            self._blocks.append(np.zeros((self.BLOCK_ROWS, self.width)))
+
+    def block(self, block_id: int) -> np.ndarray:
+        return self._blocks[block_id]
+
+    def row(self, row: int) -> np.ndarray:
+        return self._blocks[row // self.BLOCK_ROWS][row % self.BLOCK_ROWS]
+
+    def writable_row(self, row: int) -> np.ndarray:
+        self.grow(row + 1)
+        return self._writable(row // self.BLOCK_ROWS)[row % self.BLOCK_ROWS]
+
+    def add_at(self, rows: np.ndarray, values: np.ndarray, columns: Optional[np.ndarray] = None) -> None:
+        """
+        Unbuffered `np.add.at` of `values` at `rows` (and `columns`, if
+        given), copying each touched shared block once.
+        """
+        if not len(rows):
+            return
+        self.grow(int(rows.max()) + 1)
+        block_ids = rows // self.BLOCK_ROWS
+        for block_id in np.unique(block_ids):
+            selected = block_ids == block_id
+            index = rows[selected] - block_id * self.BLOCK_ROWS
+            np.add.at(
+                self._writable(block_id), index if columns is None else (index, columns[selected]), values[selected]
+            )
+
+    def to_array(self) -> np.ndarray:
+        return np.concatenate(self._blocks) if self._blocks else np.zeros((0, self.width))
+
+    def _writable(self, block_id: int) -> np.ndarray:
+        if block_id not in self._owned:
+            self._blocks[block_id] = self._blocks[block_id].copy()
+            self._owned.add(block_id)
+        return self._blocks[block_id]
+
+
+def optional_mean(value: float) -> Optional[float]:
+    """
+    Reports a mean over no rows (NaN internally) as None, which serializes to null.
+    """
+    return None if np.isnan(value) else value
+
+
+class StudentEngagementScores:
+    """
+    Materialized per-student engagement score table.
+
+    Keeps running time/completion/quiz sums and counts per student so the raw
+    score (0.4 * time share + 0.3 * mean completion + 0.3 * mean quiz score)
+    can be updated in O(1) per interaction. Min-max normalization bounds are
+    kept per row block and recomputed in one vectorized pass over a block,
+    only after a write to that block has happened.
+
+    A table is not changed once it is published in a snapshot: writers
+    `copy` it and update the copy, which shares the row blocks it does not
+    write. Copies share the student index, which only ever gains entries;
+    rows past a table's own size are ignored.
+    """
+
+    SUM_COLUMNS = ('time_spent', 'completion_status', 'quiz_score')
+
+    def __init__(self, expected_time_total: float):
+        self.expected_time_total = expected_time_total
+        self.student_index: Dict[Hashable, int] = {}
+        self._size = 0
+        # Sums for SUM_COLUMNS, then counts in the same order
+        self._values = _RowBlocks(2 * len(self.SUM_COLUMNS))
+        self._block_bounds: Dict[int, Tuple[float, float]] = {}
+        self._bounds = None
+
+    @classmethod
+    def from_frame(cls, engagement: pd.DataFrame, expected_time_total: float) -> "StudentEngagementScores":
+        table = cls(expected_time_total)
+        grouped = engagement.groupby('student_id')[list(cls.SUM_COLUMNS)].agg(['sum', 'count'])
+        table.student_index = {student_id: row for row, student_id in enumerate(grouped.index)}
+        table._size = len(table.student_index)
+        table._values = _RowBlocks.from_array(np.column_stack(
+            [grouped[(column, aggregate)] for aggregate in ('sum', 'count') for column in cls.SUM_COLUMNS]
+        ).astype(float).reshape(table._size, 2 * len(cls.SUM_COLUMNS)))
+        return table
+
+    def copy(self, expected_time_total: Optional[float] = None) -> "StudentEngagementScores":
+        table = StudentEngagementScores(
+            self.expected_time_total if expected_time_total is None else expected_time_total
+        )
+        table.student_index = self.student_index
+        table._size = self._size
+        table._values = self._values.copy()
+        if table.expected_time_total == self.expected_time_total:
+            table._block_bounds = dict(self._block_bounds)
+        return table
+
+    def update(self, interaction: Dict) -> None:
+        row = self.student_index.setdefault(interaction['student_id'], len(self.student_index))
+        self._size = max(self._size, row + 1)
+        values = self._values.writable_row(row)
+        for column, name in enumerate(self.SUM_COLUMNS):
+            value = interaction.get(name)
+            if value is not None and not pd.isna(value):
+                values[column] += value
+                values[len(self.SUM_COLUMNS) + column] += 1
+        self._block_bounds.pop(row // _RowBlocks.BLOCK_ROWS, None)
+        self._bounds = None
+
+    def score(self, student_id: Hashable) -> Optional[float]:
+        row = self._row(student_id)
+        if row is None:
+            return None
+        return float(self._raw_scores(self._values.row(row)[None, :])[0])
+
+    def normalized(self, student_id: Hashable) -> Optional[float]:
+        row = self._row(student_id)
+        if row is None:
+            return None
+        # Concurrent readers may both compute the bounds; either result is the same
+        if self._bounds is None:
+            bounds = [self._bounds_of_block(block_id) for block_id in range(-(-self._size // _RowBlocks.BLOCK_ROWS))]
+            self._bounds = (min(low for low, _ in bounds), max(high for _, high in bounds))
+        low, high = self._bounds
+        if high <= low:
+            return 0.0
+        return float((self._raw_scores(self._values.row(row)[None, :])[0] - low) / (high - low))
+
+    def _row(self, student_id: Hashable) -> Optional[int]:
+        row = self.student_index.get(student_id)
+        return row if row is not None and row < self._size else None
+
+    def _bounds_of_block(self, block_id: int) -> Tuple[float, float]:
+        bounds = self._block_bounds.get(block_id)
+        if bounds is None:
+            rows = min(_RowBlocks.BLOCK_ROWS, self._size - block_id * _RowBlocks.BLOCK_ROWS)
+            scores = self._raw_scores(self._values.block(block_id)[:rows])
+            bounds = self._block_bounds[block_id] = (scores.min(), scores.max())
+        return bounds
+
+    def _raw_scores(self, values: np.ndarray) -> np.ndarray:
+        columns = len(self.SUM_COLUMNS)
+        sums, counts = values[:, :columns], values[:, columns:]
+        means = np.divide(sums, counts, out=np.zeros(sums.shape), where=counts > 0)
+        time_score = sums[:, self.SUM_COLUMNS.index('time_spent')] / self.expected_time_total
+        return (
+            0.4 * time_score +
+            0.3 * means[:, self.SUM_COLUMNS.index('completion_status')] +
+            0.3 * means[:, self.SUM_COLUMNS.index('quiz_score')]
+        )
+
+
+class ContentPerformanceAggregates:
+    """
+    Running sums and counts behind the content-performance report.
+
+    Each interaction adds one vector of increments (row count, time/quiz
+    sums and counts, and time/quiz/rating sums over rows where all three
+    are present) to its course, to its course's content type and to the
+    global totals. Means and the mean engagement score
+    (0.4 * time / global mean time + 0.4 * quiz / 100 + 0.2 * rating / 5)
+    are then exact functions of those sums, so reads never touch history.
+    Courses are keyed by the engagement store's course codes. Published
+    aggregates are not changed; writers update a `copy`, which shares the
+    per-course row blocks and type map until it writes to them.
+    """
+
+    FIELDS = (
+        'rows', 'time_sum', 'time_count', 'quiz_sum', 'quiz_count',
+        'complete', 'complete_time', 'complete_quiz', 'complete_rating'
+    )
+
+    def __init__(self, content_types: List[str], course_types: np.ndarray):
+        self.content_types = list(content_types)
+        self._course_types = np.asarray(course_types, dtype=np.int64)
+        self._course_stats = _RowBlocks(len(self.FIELDS))
+        self._course_stats.grow(len(self._course_types))
+        self._type_stats = np.zeros((len(self.content_types), len(self.FIELDS)))
+        self._totals = np.zeros(len(self.FIELDS))
+
+    @classmethod
+    def from_store(cls, store, content_types: List[str], course_types: np.ndarray) -> "ContentPerformanceAggregates":
+        """
+        Computes every sum exactly in one vectorized pass over the store.
+        `course_types` maps each store course code to an index into
+        `content_types`, or -1 for courses outside the catalog.
+        """
+        aggregates = cls(content_types, course_types)
+        codes = store.course_codes
+        with_course = codes >= 0
+        course_stats = np.zeros((len(course_types), len(cls.FIELDS)))
+        for field, values in enumerate(cls._increments(
+            store.metric('time_spent'), store.metric('quiz_score'), store.metric('rating')
+        )):
+            aggregates._totals[field] = values.sum()
+            course_stats[:, field] = np.bincount(
+                codes[with_course], weights=values[with_course], minlength=len(course_types)
+            )
+        aggregates._course_stats = _RowBlocks.from_array(course_stats)
+        aggregates._rebuild_type_stats()
+        return aggregates
+
+    @staticmethod
+    def _increments(time_spent: np.ndarray, quiz_score: np.ndarray, rating: np.ndarray) -> Tuple[np.ndarray, ...]:
+        time_spent, quiz_score, rating = (np.asarray(values, dtype=float) for values in (time_spent, quiz_score, rating))
+        has_time, has_quiz = ~np.isnan(time_spent), ~np.isnan(quiz_score)
+        complete = has_time & has_quiz & ~np.isnan(rating)
+        return (
+            np.ones_like(time_spent),
+            np.where(has_time, time_spent, 0), has_time.astype(float),
+            np.where(has_quiz, quiz_score, 0), has_quiz.astype(float),
+            complete.astype(float),
+            np.where(complete, time_spent, 0), np.where(complete, quiz_score, 0), np.where(complete, rating, 0)
+        )
+
+    def update(self, course_codes: np.ndarray, content_types: np.ndarray, time_spent: np.ndarray,
+               quiz_score: np.ndarray, rating: np.ndarray) -> None:
+        """
+        Adds a batch of interactions. `content_types` gives each row's type
+        index, used for courses whose type is not known yet.
+        """
+        increments = np.column_stack(self._increments(time_spent, quiz_score, rating))
+        with_course = course_codes >= 0
+        codes, increments_with_course = course_codes[with_course], increments[with_course]
+        self._totals += increments.sum(axis=0)
+        if not len(codes):
+            return
+        self._grow_courses(int(codes.max()) + 1)
+        untyped = self._course_types[codes] < 0
+        if untyped.any():
+            # The type map may be shared with other copies
+            self._course_types = self._course_types.copy()
+            self._course_types[codes[untyped]] = content_types[with_course][untyped]
+        self._course_stats.add_at(codes, increments_with_course)
+        types = self._course_types[codes]
+        typed = types >= 0
+        np.add.at(self._type_stats, types[typed], increments_with_course[typed])
+
+    def copy(self) -> "ContentPerformanceAggregates":
+        aggregates = ContentPerformanceAggregates(self.content_types, self._course_types)
+        aggregates._course_stats = self._course_stats.copy()
+        aggregates._type_stats = self._type_stats.copy()
+        aggregates._totals = self._totals.copy()
+        return aggregates
+
+    def with_content_types(self, content_types: List[str], course_types: np.ndarray) -> "ContentPerformanceAggregates":
+        """
+        Returns the aggregates for a changed catalog, leaving these untouched:
+        per-type sums are re-derived from the per-course sums.
+        """
+        aggregates = ContentPerformanceAggregates(content_types, course_types)
+        aggregates._totals = self._totals.copy()
+        aggregates._course_stats = self._course_stats.copy()
+        # Pads whichever of the stats and the type map is shorter
+        aggregates._grow_courses(len(aggregates._course_types))
+        aggregates._rebuild_type_stats()
+        return aggregates
+
+    def average_time(self) -> float:
+        return self._mean(self._totals, 'time_sum', 'time_count')
+
+    def average_engagement_score(self) -> float:
+        return self._engagement_score(self._totals, self.average_time())
+
+    def mean_time_by_course(self, course_ids: List) -> Dict:
+        stats = self._course_stats.to_array()
+        return {
+            course_ids[code]: optional_mean(self._mean(stats[code], 'time_sum', 'time_count'))
+            for code in np.flatnonzero(stats[:, self.FIELDS.index('rows')] > 0)
+        }
+
+    def content_performance(self) -> Dict[str, Dict[str, Optional[float]]]:
+        average_time = self.average_time()
+        report = {'quiz_score': {}, 'engagement_score': {}, 'time_spent': {}}
+        for content_type, stats in sorted(zip(self.content_types, self._type_stats)):
+            if stats[self.FIELDS.index('rows')] == 0:
+                continue
+            report['quiz_score'][content_type] = optional_mean(self._mean(stats, 'quiz_sum', 'quiz_count'))
+            report['engagement_score'][content_type] = optional_mean(self._engagement_score(stats, average_time))
+            report['time_spent'][content_type] = optional_mean(self._mean(stats, 'time_sum', 'time_count'))
+        return report
+
+    def _engagement_score(self, stats: np.ndarray, average_time: float) -> float:
+        complete = stats[self.FIELDS.index('complete')]
+        if complete == 0:
+            return float('nan')
+        return float(
+            0.4 * self._mean(stats, 'complete_time', 'complete') / average_time +
+            0.4 * self._mean(stats, 'complete_quiz', 'complete') / 100 +
+            0.2 * self._mean(stats, 'complete_rating', 'complete') / 5
+        )
+
+    def _mean(self, stats: np.ndarray, total: str, count: str) -> float:
+        count = stats[self.FIELDS.index(count)]
+        return float(stats[self.FIELDS.index(total)] / count) if count else float('nan')
+
+    def _grow_courses(self, size: int) -> None:
+        self._course_stats.grow(size)
+        missing = len(self._course_stats) - len(self._course_types)
+        if missing > 0:
+            self._course_types = np.concatenate([self._course_types, np.full(missing, -1, dtype=np.int64)])
+
+    def _rebuild_type_stats(self) -> None:
+        course_stats = self._course_stats.to_array()
+        known = np.flatnonzero(self._course_types[:len(course_stats)] >= 0)
+        self._type_stats = np.zeros((len(self.content_types), len(self.FIELDS)))
+        np.add.at(self._type_stats, self._course_types[known], course_stats[known])
+
+
+class StudentProgressProfiles:
+    """
+    Per-student running sums behind the progress report.
+
+    Rows are keyed by the engagement store's student codes. Each holds quiz
+    sum/count, the number of completed interactions, time/quiz/rating sums
+    over rows where all three are present (for the mean engagement score,
+    whose time term is scaled by the global mean time at read time), and quiz
+    sums/counts per content type for the preferred content type. Serving a
+    profile is a handful of array reads. Published profiles are not changed;
+    writers update a `copy`, which only copies the row blocks of the students
+    it updates.
+    """
+
+    FIELDS = ('quiz_sum', 'quiz_count', 'completed', 'complete', 'complete_time', 'complete_quiz', 'complete_rating')
+
+    def __init__(self, content_types: List[str]):
+        self.content_types = list(content_types)
+        self._stats = _RowBlocks(len(self.FIELDS))
+        self._type_quiz_sum = _RowBlocks(len(self.content_types))
+        self._type_quiz_count = _RowBlocks(len(self.content_types))
+
+    @classmethod
+    def from_store(cls, store, content_types: List[str], course_types: np.ndarray) -> "StudentProgressProfiles":
+        """
+        Computes every profile in one vectorized pass over the store.
+        `course_types` maps each store course code to an index into
+        `content_types`, or -1 for courses outside the catalog.
+        """
+        profiles = cls(content_types)
+        students = store.student_codes.astype(np.int64)
+        n_students = len(store.student_ids)
+        profiles._stats = _RowBlocks.from_array(np.column_stack([
+            np.bincount(students, weights=values, minlength=n_students)
+            for values in cls._increments(
+                store.metric('time_spent'), store.metric('quiz_score'),
+                store.metric('completion_status'), store.metric('rating')
+            )
+        ]).reshape(n_students, len(cls.FIELDS)))
+
+        row_types = np.append(np.asarray(course_types, dtype=np.int64), -1)[store.course_codes]
+        quiz_score = store.metric('quiz_score').astype(float)
+        typed = np.flatnonzero((row_types >= 0) & ~np.isnan(quiz_score))
+        cells = students[typed] * len(profiles.content_types) + row_types[typed]
+        size = n_students * len(profiles.content_types)
+        shape = (n_students, len(profiles.content_types))
+        profiles._type_quiz_sum = _RowBlocks.from_array(
+            np.bincount(cells, weights=quiz_score[typed], minlength=size).reshape(shape)
+        )
+        profiles._type_quiz_count = _RowBlocks.from_array(
+            np.bincount(cells, minlength=size).astype(float).reshape(shape)
+        )
+        return profiles
+
+    @staticmethod
+    def _increments(time_spent, quiz_score, completion_status, rating) -> Tuple[np.ndarray, ...]:
+        time_spent, quiz_score, completion_status, rating = (
+            np.asarray(values, dtype=float) for values in (time_spent, quiz_score, completion_status, rating)
+        )
+        has_quiz = ~np.isnan(quiz_score)
+        complete = ~np.isnan(time_spent) & has_quiz & ~np.isnan(rating)
+        return (
+            np.where(has_quiz, quiz_score, 0), has_quiz.astype(float),
+            (completion_status == 1.0).astype(float),
+            complete.astype(float),
+            np.where(complete, time_spent, 0), np.where(complete, quiz_score, 0), np.where(complete, rating, 0)
+        )
+
+    def update(self, student_codes: np.ndarray, content_types: np.ndarray, time_spent: np.ndarray,
+               quiz_score: np.ndarray, completion_status: np.ndarray, rating: np.ndarray) -> None:
+        """
+        Adds a batch of interactions; `content_types` gives each row's type index or -1.
+        """
+        increments = np.column_stack(self._increments(time_spent, quiz_score, completion_status, rating))
+        quiz_score = np.asarray(quiz_score, dtype=float)
+        typed = (content_types >= 0) & ~np.isnan(quiz_score)
+        if len(student_codes):
+            self._grow_students(int(student_codes.max()) + 1)
+        self._stats.add_at(student_codes, increments)
+        self._type_quiz_sum.add_at(student_codes[typed], quiz_score[typed], content_types[typed])
+        self._type_quiz_count.add_at(student_codes[typed], np.ones(typed.sum()), content_types[typed])
+
+    def with_content_types(self, content_types: List[str]) -> "StudentProgressProfiles":
+        """
+        Returns the profiles with their per-type columns rearranged for a new
+        list of content types, leaving these untouched. Only valid when no
+        engaged course changed type; types new to the list start at zero.
+        """
+        profiles = StudentProgressProfiles(content_types)
+        # Column -1 of the padded arrays is all zeros
+        columns = [self.content_types.index(name) if name in self.content_types else -1 for name in content_types]
+        profiles._stats = self._stats.copy()
+        for name in ('_type_quiz_sum', '_type_quiz_count'):
+            array = getattr(self, name).to_array()
+            setattr(profiles, name, _RowBlocks.from_array(np.column_stack([array, np.zeros(len(array))])[:, columns]))
+        return profiles
+
+    def copy(self) -> "StudentProgressProfiles":
+        profiles = StudentProgressProfiles(self.content_types)
+        profiles._stats = self._stats.copy()
+        profiles._type_quiz_sum = self._type_quiz_sum.copy()
+        profiles._type_quiz_count = self._type_quiz_count.copy()
+        return profiles
+
+    def progress(self, student_code: Optional[int], average_time: float) -> Dict:
+        """
+        Returns the student's mean engagement score, mean quiz score, number
+        of completed interactions and the content type with the best mean
+        quiz score. Means over no interactions are None.
+        """
+        stats, type_sum, type_count = self._stats, self._type_quiz_sum, self._type_quiz_count
+        if student_code is None or student_code >= len(stats):
+            return {'engagement_score': None, 'quiz_performance': None,
+                    'preferred_content': None, 'completed_courses': 0}
+        row = dict(zip(self.FIELDS, stats.row(student_code)))
+        complete = row['complete']
+        engagement_score = float(
+            0.4 * row['complete_time'] / complete / average_time +
+            0.4 * row['complete_quiz'] / complete / 100 +
+            0.2 * row['complete_rating'] / complete / 5
+        ) if complete else None
+
+        # Ties go to the first content type in sorted order
+        counts = type_count.row(student_code)
+        type_means = np.divide(type_sum.row(student_code), counts, out=np.full(len(counts), -np.inf), where=counts > 0)
+        preferred = self.content_types[int(type_means.argmax())] if (counts > 0).any() else None
+        return {
+            'engagement_score': engagement_score,
+            'quiz_performance': float(row['quiz_sum'] / row['quiz_count']) if row['quiz_count'] else None,
+            'preferred_content': preferred,
+            'completed_courses': int(row['completed'])
+        }
+
+    def _grow_students(self, size: int) -> None:
+        for table in (self._stats, self._type_quiz_sum, self._type_quiz_count):
+            table.grow(size)
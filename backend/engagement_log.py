@@ -0,0 +1,396 @@
+from contextlib import contextmanager
+from threading import Event, Lock, Thread
+from typing import Callable, Dict, Iterator, List, Optional, Set, Tuple
+import fcntl
+import json
+import logging
+import os
+import re
+import time
+import uuid
+import numpy as np
+import pandas as pd
+from dataset_store import read_frame, write_frame
+
+logger = logging.getLogger(__name__)
+
+# Segments written before the log had per-writer files carry no writer id
+SEGMENT_PATTERN = re.compile(r'^segment-(?:(?P<writer>[0-9a-f]{12})-)?(?P<sequence>\d{8})\.ndjson$')
+LEGACY_WRITER = ''
+COMPACTION_LOCK_NAME = 'compaction.lock'
+QUARANTINE_NAME = 'quarantine.ndjson'
+# With a sink, each batch starts with a header line holding its key, and a
+# marker line holding the key is written once the sink has stored the batch
+BATCH_KEY = '_batch'
+STORED_KEY = '_stored'
+
+
+def _json_default(value):
+    if isinstance(value, np.generic):
+        return value.item()
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+class EngagementLog:
+    """
+    Durable append-only log of engagement events in front of the dataset snapshot.
+
+    Events are appended as JSON lines to the active segment and fsynced in
+    batches (every `fsync_batch` events or `fsync_interval` seconds, whichever
+    comes first). Compaction seals the active segment, folds the snapshot and
+    all sealed segments into a new snapshot, and then drops those segments, so
+    the write path never rewrites history.
+
+    When a `sink` is given (e.g. to insert events into the database), the log
+    is only a write-ahead log in front of it: each appended batch gets a key,
+    the caller hands it to the sink with `store` (outside its own locks), and
+    a marker for the key is logged once it is stored. Compaction hands the
+    sink, batch by batch, whatever was never marked (a failed insert, or a
+    writer that died in between) instead of folding events into the snapshot
+    file. Batches still being stored and batches that fail again are carried
+    over to the active segment, so the sealed ones can always be dropped; a
+    batch that has failed `max_store_attempts` times is moved to a quarantine
+    file for an operator to look at.
+
+    Several processes may share the directory (e.g. server workers). Each log
+    is a separate writer with its own segments and manifest, and holds an
+    exclusive lock on its writer lock file for as long as it is open.
+    Compaction runs under a directory-wide lock and only folds the compacting
+    writer's own segments and those of writers whose lock is free, i.e. whose
+    process has exited; segments a live process is appending to are never
+    touched by another.
+    """
+
+    def __init__(self, snapshot_path: str, segment_dir: str, fsync_batch: int = 64,
+                 fsync_interval: float = 1.0, compaction_interval: float = 3600.0,
+                 sink: Optional[Callable[[pd.DataFrame, bool], None]] = None, max_store_attempts: int = 5):
+        self.snapshot_path = snapshot_path
+        self.sink = sink
+        self.max_store_attempts = max_store_attempts
+        self.segment_dir = segment_dir
+        self.fsync_batch = fsync_batch
+        self.fsync_interval = fsync_interval
+        self.compaction_interval = compaction_interval
+        self.writer = uuid.uuid4().hex[:12]
+        self._lock = Lock()
+        self._compaction_lock = Lock()
+        self._pending = 0
+        self._last_sync = time.monotonic()
+        self._next_batch = 1
+        # Batches appended but not yet stored or failed on the write path
+        self._in_flight: Set[int] = set()
+        self._stop = Event()
+        self._worker: Optional[Thread] = None
+
+        os.makedirs(self.segment_dir, exist_ok=True)
+        # Taken before the first segment exists, so a writer with segments always holds its lock
+        self._writer_lock = open(self._writer_lock_path(self.writer), 'a')
+        fcntl.flock(self._writer_lock, fcntl.LOCK_EX)
+        self._sequence = 1
+        self._file = open(self._segment_path(self.writer, self._sequence), 'a', encoding='utf-8')
+
+    def append(self, record: Dict) -> Optional[int]:
+        return self.append_many([record])
+
+    def append_many(self, records: List[Dict]) -> Optional[int]:
+        """
+        Appends a batch of events with one write; the batch counts towards
+        fsync_batch as a whole. With a sink, returns the batch's key for `store`.
+        """
+        with self._lock:
+            if self.sink is None:
+                self._write(records)
+                return None
+            batch = self._new_batch()
+            self._write(records, {BATCH_KEY: batch})
+            self._in_flight.add(batch)
+            return batch
+
+    def store(self, batch: int, records: List[Dict]) -> None:
+        """
+        Hands a batch returned by append_many to the sink and marks it stored.
+        If the sink fails, the batch stays in the log for compaction to retry.
+        """
+        try:
+            self.sink(pd.DataFrame(records), True)
+        except Exception as e:
+            logger.error(f"Error storing {len(records)} engagement events, keeping them for compaction: {e}")
+            with self._lock:
+                self._in_flight.discard(batch)
+            return
+        with self._lock:
+            self._file.write(json.dumps({STORED_KEY: batch}) + '\n')
+            # Synced right away, so a crash cannot make recovery store the batch twice
+            self._sync()
+            self._in_flight.discard(batch)
+
+    def flush(self) -> None:
+        with self._lock:
+            self._sync()
+
+    def replay(self) -> pd.DataFrame:
+        """
+        Returns every event logged since the last compaction, by any writer,
+        in append order per writer.
+        """
+        records: List[Dict] = []
+        for writer, sequences in self._writers().items():
+            compacted_through = self._compacted_through(writer)
+            lines = [line for sequence in sequences if sequence > compacted_through
+                     for line in self._read_segment(writer, sequence)]
+            for _, batch_records in self._unstored_batches(lines):
+                records.extend(batch_records)
+        return pd.DataFrame(records)
+
+    def replay_with_snapshot(self, load_snapshot: Callable[[], pd.DataFrame]) -> Tuple[pd.DataFrame, pd.DataFrame]:
+        """
+        Returns `load_snapshot()` and `replay()`, read together under the
+        directory-wide lock so that no compaction lands between the two reads
+        and loses or double-counts the events it folds.
+        """
+        with self._directory_lock():
+            return load_snapshot(), self.replay()
+
+    def compact(self) -> None:
+        """
+        Folds all sealed segments into the snapshot (or the sink) and removes
+        them: this writer's own, and every segment of writers that have exited.
+        """
+        with self._compaction_lock, self._directory_lock():
+            with self._lock:
+                self._sync()
+                self._file.close()
+                sealed_through = self._sequence
+                self._sequence += 1
+                self._file = open(self._segment_path(self.writer, self._sequence), 'a', encoding='utf-8')
+                # Taken with the seal, so a batch outside this set has its marker in a sealed segment
+                in_flight = set(self._in_flight)
+
+            folded = []
+            for writer, sequences in self._writers().items():
+                if writer == self.writer:
+                    through = sealed_through
+                else:
+                    exited = self._lock_exited_writer(writer)
+                    if exited is None:
+                        continue
+                    through = max(sequences, default=0)
+                compacted_through = self._compacted_through(writer)
+                sealed = [sequence for sequence in sequences if compacted_through < sequence <= through]
+                lines = [line for sequence in sealed for line in self._read_segment(writer, sequence)]
+                folded.append((writer, through, sealed, lines, None if writer == self.writer else exited))
+
+            if self.sink is not None:
+                for writer, _, _, lines, _ in folded:
+                    self._store_sealed(writer, lines, in_flight if writer == self.writer else set())
+                with self._lock:
+                    # Batches carried over must be durable before the segments they came from go
+                    self._sync()
+            else:
+                frames = [pd.DataFrame(records) for _, _, _, lines, _ in folded
+                          for _, records in self._unstored_batches(lines)]
+                if frames:
+                    if os.path.exists(self.snapshot_path):
+                        frames.insert(0, read_frame(self.snapshot_path, 'engagement'))
+                    write_frame(pd.concat(frames, ignore_index=True), self.snapshot_path, 'engagement')
+
+            # A manifest is what makes replay skip the folded segments, so it
+            # is written only once the events are stored
+            for writer, through, sealed, _, exited in folded:
+                if exited is None:
+                    self._write_manifest(writer, through)
+                for sequence in sealed:
+                    os.remove(self._segment_path(writer, sequence))
+                if exited is not None:
+                    self._remove_writer(writer, exited)
+            count = sum(BATCH_KEY not in line and STORED_KEY not in line for _, _, _, lines, _ in folded for line in lines)
+            logger.info(f"Compacted {count} engagement events from {len(folded)} writers")
+
+    def start(self) -> None:
+        """
+        Starts the background thread that handles timed fsyncs and periodic compaction.
+        """
+        if self._worker is None:
+            self._worker = Thread(target=self._run, name='engagement-log', daemon=True)
+            self._worker.start()
+
+    def close(self) -> None:
+        self._stop.set()
+        if self._worker is not None:
+            self._worker.join()
+        with self._lock:
+            self._sync()
+            self._file.close()
+        self._writer_lock.close()
+
+    def _write(self, records: List[Dict], header: Optional[Dict] = None) -> None:
+        """
+        Writes a batch (after its header, if any) with one write. Callers hold _lock.
+        """
+        lines = ''.join(json.dumps(record, default=_json_default) + '\n' for record in records)
+        if header is not None:
+            lines = json.dumps(header) + '\n' + lines
+        self._file.write(lines)
+        self._pending += len(records)
+        if self._pending >= self.fsync_batch or time.monotonic() - self._last_sync >= self.fsync_interval:
+            self._sync()
+
+    def _new_batch(self) -> int:
+        batch = self._next_batch
+        self._next_batch += 1
+        return batch
+
+    def _store_sealed(self, writer: str, lines: List[Dict], in_flight: Set[int]) -> None:
+        """
+        Hands the sink each batch in a writer's sealed segments that was never
+        marked stored. This writer's batches still being stored keep their
+        key and are carried over to the active segment, where their marker
+        will follow; a batch that fails is carried over with its attempt
+        counted, or quarantined once it reaches max_store_attempts.
+        """
+        own = writer == self.writer
+        for header, records in self._unstored_batches(lines):
+            if own and header.get(BATCH_KEY) in in_flight:
+                with self._lock:
+                    self._write(records, header)
+                continue
+            # Only this process already holds its own events in memory
+            applied = own and not header.get('foreign', False)
+            try:
+                self.sink(pd.DataFrame(records), applied)
+            except Exception as e:
+                attempts = header.get('attempts', 0) + 1
+                if attempts >= self.max_store_attempts:
+                    logger.error(f"Quarantining {len(records)} engagement events after {attempts} failed attempts to store them: {e}")
+                    self._quarantine(records)
+                    continue
+                logger.error(f"Error storing {len(records)} engagement events, retrying at the next compaction: {e}")
+                with self._lock:
+                    self._write(records, {BATCH_KEY: self._new_batch(), 'attempts': attempts, 'foreign': not applied})
+
+    def _quarantine(self, records: List[Dict]) -> None:
+        with open(os.path.join(self.segment_dir, QUARANTINE_NAME), 'a', encoding='utf-8') as quarantine:
+            quarantine.write(''.join(json.dumps(record, default=_json_default) + '\n' for record in records))
+            quarantine.flush()
+            os.fsync(quarantine.fileno())
+
+    @staticmethod
+    def _unstored_batches(lines: List[Dict]) -> List[Tuple[Dict, List[Dict]]]:
+        """
+        Splits a writer's log lines into (header, events) batches and drops
+        the ones marked stored. Events logged without a sink have no header
+        and form a single batch.
+        """
+        stored = {line[STORED_KEY] for line in lines if STORED_KEY in line}
+        batches: List[Tuple[Dict, List[Dict]]] = [({}, [])]
+        for line in lines:
+            if BATCH_KEY in line:
+                batches.append((line, []))
+            elif STORED_KEY not in line:
+                batches[-1][1].append(line)
+        return [(header, records) for header, records in batches if records and header.get(BATCH_KEY) not in stored]
+
+    def _run(self) -> None:
+        next_compaction = time.monotonic() + self.compaction_interval
+        while not self._stop.wait(self.fsync_interval):
+            try:
+                with self._lock:
+                    if self._pending:
+                        self._sync()
+                if time.monotonic() >= next_compaction:
+                    self.compact()
+                    next_compaction = time.monotonic() + self.compaction_interval
+            except Exception as e:
+                logger.error(f"Error maintaining engagement log: {e}")
+
+    def _sync(self) -> None:
+        self._file.flush()
+        os.fsync(self._file.fileno())
+        self._pending = 0
+        self._last_sync = time.monotonic()
+
+    @contextmanager
+    def _directory_lock(self) -> Iterator[None]:
+        with open(os.path.join(self.segment_dir, COMPACTION_LOCK_NAME), 'a') as lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def _lock_exited_writer(self, writer: str):
+        """
+        Returns the locked lock file of a writer whose process has exited, or
+        None while the writer is still alive.
+        """
+        lock_file = open(self._writer_lock_path(writer), 'a')
+        if writer == LEGACY_WRITER:
+            return lock_file
+        try:
+            fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            lock_file.close()
+            return None
+        return lock_file
+
+    def _remove_writer(self, writer: str, lock_file) -> None:
+        manifest_path = self._manifest_path(writer)
+        if os.path.exists(manifest_path):
+            os.remove(manifest_path)
+        os.remove(self._writer_lock_path(writer))
+        lock_file.close()
+
+    def _read_segment(self, writer: str, sequence: int) -> List[Dict]:
+        """
+        Returns the segment's lines: events, and with a sink, batch headers and stored markers.
+        """
+        records = []
+        with open(self._segment_path(writer, sequence), encoding='utf-8') as segment:
+            for line in segment:
+                try:
+                    records.append(json.loads(line))
+                except json.JSONDecodeError:
+                    # A torn final line from a crash mid-write is the only expected cause
+                    logger.warning(f"Skipping unreadable line in engagement segment {writer}-{sequence}")
+        return records
+
+    def _segment_path(self, writer: str, sequence: int) -> str:
+        prefix = f'segment-{writer}-' if writer else 'segment-'
+        return os.path.join(self.segment_dir, f'{prefix}{sequence:08d}.ndjson')
+
+    def _manifest_path(self, writer: str) -> str:
+        return os.path.join(self.segment_dir, f'manifest-{writer}.json' if writer else 'manifest.json')
+
+    def _writer_lock_path(self, writer: str) -> str:
+        return os.path.join(self.segment_dir, f'writer-{writer or "legacy"}.lock')
+
+    def _writers(self) -> Dict[str, List[int]]:
+        """
+        Maps every writer with segments on disk to its sorted segment sequences.
+        """
+        writers: Dict[str, List[int]] = {}
+        for name in os.listdir(self.segment_dir):
+            match = SEGMENT_PATTERN.match(name)
+            if match:
+                writers.setdefault(match.group('writer') or LEGACY_WRITER, []).append(int(match.group('sequence')))
+        return {writer: sorted(sequences) for writer, sequences in writers.items()}
+
+    def _compacted_through(self, writer: str) -> int:
+        manifest_path = self._manifest_path(writer)
+        if not os.path.exists(manifest_path):
+            return 0
+        with open(manifest_path, encoding='utf-8') as manifest:
+            return json.load(manifest)['compacted_through']
+
+    def _write_manifest(self, writer: str, compacted_through: int) -> None:
+        manifest_path = self._manifest_path(writer)
+        tmp_path = manifest_path + '.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as manifest:
+            json.dump({'compacted_through': compacted_through}, manifest)
+        self._fsync_path(tmp_path)
+        os.replace(tmp_path, manifest_path)
+
+    @staticmethod
+    def _fsync_path(path: str) -> None:
+        with open(path, 'rb+') as handle:
+            os.fsync(handle.fileno())
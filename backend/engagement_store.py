@@ -0,0 +1,234 @@
+from threading import Lock
+from typing import Callable, Dict, Hashable, List, Optional
+import sys
+import numpy as np
+import pandas as pd
+
+NO_COURSE = -1
+
+
+class _RowIndexState:
+    __slots__ = ('indptr', 'order', 'tail', 'tail_size')
+
+    def __init__(self, indptr: np.ndarray, order: np.ndarray):
+        self.indptr = indptr
+        self.order = order
+        self.tail: Dict[int, List[int]] = {}
+        self.tail_size = 0
+
+
+class RowIndex:
+    """
+    Groups store rows by one of its code columns.
+
+    Rows present at the last rebuild are sorted by code with CSR-style
+    offsets, so a code's rows are one contiguous slice; rows appended since
+    go to small per-code tail lists. Once the tail outgrows a fraction of the
+    sorted part the index is rebuilt with one stable counting sort, keeping
+    appends O(1) amortized. Readers work on whichever state was current when
+    they started, which is swapped in whole.
+    """
+
+    def __init__(self, codes: Callable[[], np.ndarray], min_merge_size: int = 1024, merge_ratio: float = 0.1):
+        self._codes = codes
+        self.min_merge_size = min_merge_size
+        self.merge_ratio = merge_ratio
+        self._state: Optional[_RowIndexState] = None
+        self._lock = Lock()
+
+    def rows(self, code: int) -> np.ndarray:
+        """
+        Returns the rows holding `code`, in ascending order.
+        """
+        state = self._state or self._rebuild()
+        rows = state.order[state.indptr[code]:state.indptr[code + 1]] if code + 1 < len(state.indptr) else state.order[:0]
+        tail = state.tail.get(code)
+        return np.concatenate([rows, tail]).astype(rows.dtype) if tail else rows
+
+    def add(self, code: int, row: int) -> None:
+        with self._lock:
+            state = self._state
+            if state is None:
+                # Not built yet; the first read indexes every row
+                return
+            state.tail.setdefault(code, []).append(row)
+            state.tail_size += 1
+            if state.tail_size > max(self.min_merge_size, self.merge_ratio * len(state.order)):
+                self._state = None
+        if self._state is None:
+            self._rebuild()
+
+    def invalidate(self) -> None:
+        with self._lock:
+            self._state = None
+
+    def nbytes(self) -> int:
+        state = self._state
+        return 0 if state is None else state.indptr.nbytes + state.order.nbytes
+
+    def _rebuild(self) -> _RowIndexState:
+        with self._lock:
+            if self._state is not None:
+                return self._state
+            codes = self._codes()
+            valid = np.flatnonzero(codes >= 0)
+            dtype = np.int32 if len(codes) < np.iinfo(np.int32).max else np.int64
+            order = valid[np.argsort(codes[valid], kind='stable')].astype(dtype)
+            counts = np.bincount(codes[valid], minlength=int(codes.max(initial=-1)) + 1)
+            indptr = np.concatenate([[0], np.cumsum(counts)]).astype(np.int64)
+            self._state = _RowIndexState(indptr, order)
+            return self._state
+
+
+class EngagementStore:
+    """
+    Compact columnar store of engagement events.
+
+    Student and course ids are stored as dense int32 codes into lookup tables
+    (student_ids / course_ids), the metrics as float32 columns, and nothing
+    that can be looked up elsewhere (course names, content types) is kept per
+    row. Columns are preallocated arrays that grow by half when full, so appends
+    cost O(1) amortized. Readers take a view of the first `size` rows; a grow
+    swaps in new arrays without touching the ones a reader may still hold.
+    A row index by student gives each student's rows without a scan; it is
+    built on first use and then maintained on append.
+    """
+
+    METRICS = ('time_spent', 'quiz_score', 'completion_status', 'rating')
+
+    def __init__(self, capacity: int = 1024):
+        self.size = 0
+        self.student_ids: List[Hashable] = []
+        self.student_index: Dict[Hashable, int] = {}
+        self.course_ids: List[Hashable] = []
+        self.course_index: Dict[Hashable, int] = {}
+        self._student_codes = np.zeros(capacity, dtype=np.int32)
+        self._course_codes = np.full(capacity, NO_COURSE, dtype=np.int32)
+        self._metrics = {name: np.full(capacity, np.nan, dtype=np.float32) for name in self.METRICS}
+        self.student_rows = RowIndex(lambda: self.student_codes)
+
+    @classmethod
+    def from_frame(cls, engagement: pd.DataFrame) -> "EngagementStore":
+        store = cls(capacity=max(len(engagement), 1))
+        store.extend(engagement)
+        return store
+
+    def __len__(self) -> int:
+        return self.size
+
+    @property
+    def student_codes(self) -> np.ndarray:
+        return self._student_codes[:self.size]
+
+    @property
+    def course_codes(self) -> np.ndarray:
+        return self._course_codes[:self.size]
+
+    def metric(self, name: str) -> np.ndarray:
+        return self._metrics[name][:self.size]
+
+    def student_code(self, student_id: Hashable) -> Optional[int]:
+        return self.student_index.get(student_id)
+
+    def extend(self, engagement: pd.DataFrame) -> None:
+        """
+        Appends a frame of events in one vectorized pass.
+        """
+        start, stop = self.size, self.size + len(engagement)
+        self._reserve(stop)
+        self._student_codes[start:stop] = self._encode(engagement['student_id'], self.student_ids, self.student_index)
+        self._course_codes[start:stop] = self._encode(engagement['course_id'], self.course_ids, self.course_index)
+        for name in self.METRICS:
+            if name in engagement.columns:
+                self._metrics[name][start:stop] = pd.to_numeric(engagement[name], errors='coerce').to_numpy(
+                    dtype=np.float32, na_value=np.nan
+                )
+        self.size = stop
+        self.student_rows.invalidate()
+
+    def append(self, record: Dict) -> int:
+        """
+        Appends one event and returns its row.
+        """
+        row = self.size
+        self._reserve(row + 1)
+        self._student_codes[row] = self._code(record['student_id'], self.student_ids, self.student_index)
+        course_id = record.get('course_id')
+        if course_id is not None and not pd.isna(course_id):
+            self._course_codes[row] = self._code(course_id, self.course_ids, self.course_index)
+        for name in self.METRICS:
+            value = record.get(name)
+            if value is not None:
+                self._metrics[name][row] = value
+        self.size = row + 1
+        self.student_rows.add(int(self._student_codes[row]), row)
+        return row
+
+    def to_frame(self, columns: Optional[List[str]] = None, rows: Optional[np.ndarray] = None) -> pd.DataFrame:
+        """
+        Decodes (a subset of) the store into a DataFrame with the original ids.
+        Rows without a course have a missing course_id.
+        """
+        columns = columns or ['student_id', 'course_id', *self.METRICS]
+        rows = np.arange(self.size) if rows is None else rows
+        frame = {}
+        for column in columns:
+            if column == 'student_id':
+                frame[column] = np.asarray(self.student_ids)[self._student_codes[rows]]
+            elif column == 'course_id':
+                codes = self._course_codes[rows]
+                course_ids = np.append(np.asarray(self.course_ids, dtype=np.int32), 0)[codes]
+                frame[column] = pd.arrays.IntegerArray(course_ids, codes == NO_COURSE)
+            else:
+                frame[column] = self._metrics[column][rows]
+        return pd.DataFrame(frame, columns=columns)
+
+    def memory_usage(self) -> Dict[str, float]:
+        """
+        Reports the bytes held by the store, in total and per stored interaction.
+        """
+        column_bytes = self._student_codes.nbytes + self._course_codes.nbytes + sum(
+            column.nbytes for column in self._metrics.values()
+        ) + self.student_rows.nbytes()
+        lookup_bytes = sum(
+            sys.getsizeof(ids) + sys.getsizeof(index) + sum(sys.getsizeof(value) for value in ids)
+            for ids, index in ((self.student_ids, self.student_index), (self.course_ids, self.course_index))
+        )
+        total = column_bytes + lookup_bytes
+        return {
+            'interactions': self.size,
+            'capacity': len(self._student_codes),
+            'bytes': total,
+            'bytes_per_interaction': total / self.size if self.size else 0.0
+        }
+
+    def _reserve(self, size: int) -> None:
+        capacity = len(self._student_codes)
+        if size <= capacity:
+            return
+        capacity = max(size, capacity + capacity // 2)
+        self._student_codes = self._resized(self._student_codes, capacity, 0)
+        self._course_codes = self._resized(self._course_codes, capacity, NO_COURSE)
+        self._metrics = {name: self._resized(column, capacity, np.nan) for name, column in self._metrics.items()}
+
+    @staticmethod
+    def _resized(array: np.ndarray, capacity: int, fill) -> np.ndarray:
+        resized = np.full(capacity, fill, dtype=array.dtype)
+        resized[:len(array)] = array
+        return resized
+
+    @staticmethod
+    def _code(value: Hashable, ids: List[Hashable], index: Dict[Hashable, int]) -> int:
+        code = index.get(value)
+        if code is None:
+            code = index[value] = len(ids)
+            ids.append(value)
+        return code
+
+    @classmethod
+    def _encode(cls, values: pd.Series, ids: List[Hashable], index: Dict[Hashable, int]) -> np.ndarray:
+        # Factorize once so only the distinct values go through the lookup table;
+        # the trailing entry maps factorize's -1 (missing) to NO_COURSE
+        codes, uniques = pd.factorize(values)
+        lookup = np.array([cls._code(int(value), ids, index) for value in uniques] + [NO_COURSE], dtype=np.int32)
+        return lookup[codes]
@@ -0,0 +1,112 @@
+from datetime import datetime
+from threading import Event, Lock, Thread
+from typing import Callable, Dict, Iterable, Optional, Set
+import logging
+import time
+import pandas as pd
+from prometheus_client import Gauge
+from sqlalchemy import func, or_, select
+from sqlalchemy.engine import Engine
+from dataset_store import apply_schema
+from db_source import ENGAGEMENT_COLUMNS
+from models import Engagement
+
+logger = logging.getLogger(__name__)
+
+ENGAGEMENT_SYNC_LAG_ROWS = Gauge('engagement_sync_lag_rows', 'Engagement rows in the database not yet applied by this worker')
+ENGAGEMENT_SYNC_LAG_SECONDS = Gauge('engagement_sync_lag_seconds', 'Age of the oldest engagement row not yet applied by this worker')
+
+
+class EngagementTailer:
+    """
+    Polls the engagements table for rows past a high-watermark id and hands
+    them to `apply` in id order, so every worker sees writes made by others.
+
+    Ids are allocated before transactions commit, so a row can become visible
+    after rows with higher ids. Ids skipped below the watermark are kept as
+    gaps and re-queried on each poll until they show up or `gap_timeout`
+    seconds pass (the insert was rolled back). Rows this process inserted
+    itself are already applied in memory; their ids are claimed before
+    commit and skipped.
+    """
+
+    def __init__(self, sql_engine: Engine, apply: Callable[[pd.DataFrame], None], watermark: int = 0,
+                 interval: float = 1.0, batch_size: int = 10000, gap_timeout: float = 60.0):
+        self.sql_engine = sql_engine
+        self.apply = apply
+        self.watermark = watermark
+        self.interval = interval
+        self.batch_size = batch_size
+        self.gap_timeout = gap_timeout
+        self._gaps: Dict[int, float] = {}
+        self._claimed: Set[int] = set()
+        self._lock = Lock()
+        self._stop = Event()
+        self._worker: Optional[Thread] = None
+
+    def claim(self, ids: Iterable[int]) -> None:
+        """
+        Marks rows inserted by this process, so the tailer does not apply them twice.
+        """
+        with self._lock:
+            self._claimed.update(ids)
+
+    def poll(self) -> int:
+        """
+        Applies at most one batch of new rows and returns how many were read.
+        """
+        now = time.monotonic()
+        self._gaps = {row_id: seen for row_id, seen in self._gaps.items() if now - seen < self.gap_timeout}
+        condition = Engagement.id > self.watermark
+        if self._gaps:
+            condition = or_(condition, Engagement.id.in_(list(self._gaps)))
+        statement = select(Engagement.id, *ENGAGEMENT_COLUMNS).where(condition).order_by(Engagement.id).limit(self.batch_size)
+        with self.sql_engine.connect() as connection:
+            rows = pd.DataFrame.from_records(connection.execute(statement).all(), columns=['id', *(c.name for c in ENGAGEMENT_COLUMNS)])
+
+        if not rows.empty:
+            ids = set(rows['id'].tolist())
+            for row_id in ids:
+                self._gaps.pop(row_id, None)
+            highest = max(ids)
+            # A jump far larger than a batch is a sequence reset, not transactions in flight
+            if highest - self.watermark - len(ids) <= self.batch_size:
+                for row_id in range(self.watermark + 1, highest):
+                    if row_id not in ids:
+                        self._gaps[row_id] = now
+            self.watermark = max(self.watermark, highest)
+
+            with self._lock:
+                own = rows['id'].isin(self._claimed).to_numpy()
+                self._claimed.difference_update(rows.loc[own, 'id'].tolist())
+            if not own.all():
+                self.apply(apply_schema(rows[~own].drop(columns='id'), 'engagement'))
+
+        self._update_lag()
+        return len(rows)
+
+    def start(self) -> None:
+        if self._worker is None:
+            self._worker = Thread(target=self._run, name='engagement-tailer', daemon=True)
+            self._worker.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._worker is not None:
+            self._worker.join()
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.interval):
+            try:
+                # Keep reading while full batches come back, so a backlog drains without waiting
+                while self.poll() >= self.batch_size and not self._stop.is_set():
+                    pass
+            except Exception as e:
+                logger.error(f"Engagement sync failed: {e}")
+
+    def _update_lag(self) -> None:
+        statement = select(func.count(), func.min(Engagement.created_at)).where(Engagement.id > self.watermark)
+        with self.sql_engine.connect() as connection:
+            pending, oldest = connection.execute(statement).one()
+        ENGAGEMENT_SYNC_LAG_ROWS.set(pending)
+        ENGAGEMENT_SYNC_LAG_SECONDS.set((datetime.utcnow() - oldest).total_seconds() if oldest else 0)
@@ -0,0 +1,79 @@
+from typing import Dict, Hashable, Optional, Set
+import time
+import numpy as np
+import pandas as pd
+from engagement_aggregates import ContentPerformanceAggregates, StudentEngagementScores, StudentProgressProfiles
+from engagement_store import EngagementStore
+from model_training import ModelGeneration
+
+
+class EngineSnapshot:
+    """
+    Everything a read request needs, as one consistent version: the models,
+    the catalog and the structures aligned to it, the engagement rows that
+    existed at publish time and the aggregates computed over them.
+
+    Snapshots are never changed once published. Writers build the next one
+    with `replace` and publish it with a single reference swap, so readers
+    take `engine.snapshot` once and use it without locking. The engagement
+    store is append-only and shared between snapshots; each snapshot only
+    sees its first `engagement_rows` rows and `engagement_students` students.
+    Everything else, including the aggregate tables and the CF scorer's
+    fold-in overrides, is copied by a writer before it changes and published
+    with the next snapshot.
+    """
+
+    def __init__(self, version: int, models: Optional[ModelGeneration], courses: pd.DataFrame,
+                 course_positions: Dict[Hashable, int], available_courses_index: Set[Hashable],
+                 course_difficulty_rank: np.ndarray, course_code_positions: np.ndarray,
+                 course_rating_sum: np.ndarray, course_rating_count: np.ndarray,
+                 engagement: EngagementStore, engagement_rows: int, engagement_students: int,
+                 cached_engagement_scores: StudentEngagementScores,
+                 content_performance: ContentPerformanceAggregates,
+                 student_progress: StudentProgressProfiles):
+        self.version = version
+        self.models = models
+        self.courses = courses
+        self.course_positions = course_positions
+        self.available_courses_index = available_courses_index
+        self.course_difficulty_rank = course_difficulty_rank
+        self.course_code_positions = course_code_positions
+        self.course_rating_sum = course_rating_sum
+        self.course_rating_count = course_rating_count
+        self.engagement = engagement
+        self.engagement_rows = engagement_rows
+        self.engagement_students = engagement_students
+        self.cached_engagement_scores = cached_engagement_scores
+        self.content_performance = content_performance
+        self.student_progress = student_progress
+        self.created_at = time.time()
+
+    def replace(self, **changes) -> "EngineSnapshot":
+        """
+        Returns the next version, sharing every field that is not changed.
+        """
+        fields = {name: value for name, value in vars(self).items() if name != 'created_at'}
+        fields.update(changes, version=self.version + 1)
+        return EngineSnapshot(**fields)
+
+    def student_code(self, student_id: Hashable) -> Optional[int]:
+        code = self.engagement.student_code(student_id)
+        return code if code is not None and code < self.engagement_students else None
+
+    def student_rows(self, student_id: Hashable) -> np.ndarray:
+        code = self.student_code(student_id)
+        if code is None:
+            return np.empty(0, dtype=np.int64)
+        # Index rows are ascending, so the rows appended after this snapshot are a suffix
+        rows = self.engagement.student_rows.rows(code)
+        return rows[:np.searchsorted(rows, self.engagement_rows)]
+
+    def course_popularity(self) -> np.ndarray:
+        # Mean rating scaled to [0, 1]; courses nobody has rated score 0
+        mean_rating = np.divide(
+            self.course_rating_sum,
+            self.course_rating_count,
+            out=np.zeros(len(self.course_rating_sum)),
+            where=self.course_rating_count > 0
+        )
+        return mean_rating / 5
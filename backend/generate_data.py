@@ -0,0 +1,338 @@
+from datetime import datetime
+from itertools import combinations
+from typing import Dict, Iterator, Sequence, Tuple
+import argparse
+import logging
+import os
+import time
+import numpy as np
+import pandas as pd
+from dataset_store import FORMATS, apply_schema, dataset_path
+
+logger = logging.getLogger(__name__)
+
+base_dir = os.path.dirname(os.path.abspath(__file__))
+data_dir = os.path.join(base_dir, 'data')
+
+DOMAINS = ['gmail.com', 'yahoo.com', 'outlook.com', 'hotmail.com']
+SKILL_LEVELS = ['beginner', 'intermediate', 'advanced']
+INTERESTS = ['Web Development', 'Mobile Development', 'AI/ML',
+             'Database Management', 'Desktop Applications', 'Programming Languages']
+CONTENT_TYPES = ['Video', 'Interactive', 'Project-based', 'Text', 'Mixed']
+DIFFICULTY_LEVELS = ['Beginner', 'Intermediate', 'Advanced']
+COMPLETION_LEVELS = [0, 0.25, 0.5, 0.75, 1.0]
+COMPLETION_WEIGHTS = [0.1, 0.2, 0.3, 0.2, 0.2]
+
+# Keyed by category_id; interests above are the category names in the same order
+COURSE_TEMPLATES = {
+    1: ['Frontend Development with {}', 'Backend Development with {}', 'Full Stack {}', 'Modern {} Development'],
+    2: ['{} App Development', 'Cross-platform {} Development', 'Native {} Development'],
+    3: ['{} Fundamentals', 'Advanced {}', '{} in Practice', 'Applied {}'],
+    4: ['{} Database Design', '{} Administration', '{} Performance Tuning', '{} Security'],
+    5: ['{} GUI Development', '{} Application Architecture', 'Building {} Apps'],
+    6: ['{} Programming', 'Advanced {}', '{} Data Structures', '{} Algorithms']
+}
+TECHNOLOGIES = {
+    1: ['React', 'Angular', 'Vue.js', 'Node.js', 'Django', 'Flask'],
+    2: ['iOS', 'Android', 'React Native', 'Flutter', 'Kotlin'],
+    3: ['Machine Learning', 'Deep Learning', 'Neural Networks', 'Computer Vision', 'NLP'],
+    4: ['MySQL', 'PostgreSQL', 'MongoDB', 'Redis', 'Oracle'],
+    5: ['PyQt', 'JavaFX', 'Electron', 'WPF', '.NET'],
+    6: ['Python', 'Java', 'C++', 'JavaScript', 'Go', 'Rust']
+}
+FEATURES = {
+    1: ['Build responsive websites', 'Create modern UIs', 'Handle API integration', 'Implement authentication', 'Database integration'],
+    2: ['Cross-platform development', 'Native features access', 'Mobile UI/UX', 'App store deployment', 'Push notifications'],
+    3: ['Data preprocessing', 'Model training', 'Neural network architecture', 'Hyperparameter tuning', 'Model deployment'],
+    4: ['Schema design', 'Query optimization', 'Data modeling', 'Backup and recovery', 'Security implementation'],
+    5: ['UI component design', 'Event handling', 'System integration', 'Cross-platform compatibility', 'Performance optimization'],
+    6: ['Object-oriented programming', 'Memory management', 'Concurrent programming', 'Standard libraries', 'Best practices']
+}
+
+
+def _subsets(options: Sequence[str], min_size: int, max_size: int, separator: str) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Returns every subset of `options` with min_size..max_size members as
+    joined labels, and the (start, count) of each subset size in the labels.
+    """
+    labels, groups = [], []
+    for size in range(min_size, max_size + 1):
+        joined = [separator.join(subset) for subset in combinations(options, size)]
+        groups.append((len(labels), len(joined)))
+        labels.extend(joined)
+    return np.array(labels, dtype=object), np.array(groups)
+
+
+def _sample_subsets(rng: np.random.Generator, options: Sequence[str], min_size: int, max_size: int,
+                    n: int, separator: str = ',') -> np.ndarray:
+    # Size uniform first, then a subset of that size, like choosing k and then k distinct options
+    labels, groups = _subsets(options, min_size, max_size, separator)
+    start, count = groups[rng.integers(0, len(groups), n)].T
+    return labels[start + (rng.random(n) * count).astype(np.int64)]
+
+
+def _pick(rng: np.random.Generator, options: Sequence[str], n: int, p: Sequence[float] = None) -> np.ndarray:
+    return np.asarray(options, dtype=object)[rng.choice(len(options), size=n, p=p)]
+
+
+def _pick_categorical(rng: np.random.Generator, options: Sequence[str], n: int) -> pd.Categorical:
+    # Fixed categories, so every chunk of a columnar file shares one dictionary
+    return pd.Categorical.from_codes(rng.integers(0, len(options), n), categories=options)
+
+
+def _chunks(total: int, chunk_size: int) -> Iterator[Tuple[int, int]]:
+    for start in range(0, total, chunk_size):
+        yield start, min(start + chunk_size, total)
+
+
+def generate_students(rng: np.random.Generator, n_students: int, first_id: int,
+                      chunk_size: int) -> Iterator[pd.DataFrame]:
+    today = np.datetime64(datetime.now().date(), 'D')
+    for start, stop in _chunks(n_students, chunk_size):
+        n = stop - start
+        numbers = pd.Series(np.arange(start + 1, stop + 1)).astype(str)
+        yield pd.DataFrame({
+            'student_id': np.arange(first_id + start, first_id + stop, dtype=np.int64),
+            'full_name': 'Student_' + numbers,
+            'email': 'student_' + numbers + '@' + _pick(rng, DOMAINS, n),
+            'skill_level': _pick_categorical(rng, SKILL_LEVELS, n),
+            'registration_date': (today - rng.integers(1, 365, n)).astype(str),
+            'interests': _sample_subsets(rng, INTERESTS, 1, 3, n),
+            'preferences': 'preference_tag_' + pd.Series(rng.integers(1, 6, n)).astype(str),
+            'active_status': rng.choice([1, 0], size=n, p=[0.9, 0.1])
+        })
+
+
+def generate_courses(rng: np.random.Generator, n_courses: int, first_id: int) -> pd.DataFrame:
+    """
+    Builds the whole catalog; interactions need every course's name and average time.
+    """
+    category_id = rng.integers(1, 7, n_courses)
+    content_type = _pick(rng, CONTENT_TYPES, n_courses)
+    difficulty = _pick(rng, DIFFICULTY_LEVELS, n_courses)
+    course_name = np.empty(n_courses, dtype=object)
+    technology = np.empty(n_courses, dtype=object)
+    features = np.empty(n_courses, dtype=object)
+    for category, templates in COURSE_TEMPLATES.items():
+        rows = np.flatnonzero(category_id == category)
+        technologies = TECHNOLOGIES[category]
+        # Every (template, technology) name is formatted once and looked up by index
+        names = np.array([[template.format(tech) for tech in technologies] for template in templates], dtype=object)
+        template_index = rng.integers(0, len(templates), len(rows))
+        technology_index = rng.integers(0, len(technologies), len(rows))
+        technology[rows] = np.asarray(technologies, dtype=object)[technology_index]
+        course_name[rows] = names[template_index, technology_index]
+        features[rows] = _sample_subsets(rng, FEATURES[category], 2, 4, len(rows), separator=', ')
+
+    return pd.DataFrame({
+        'course_id': np.arange(first_id, first_id + n_courses, dtype=np.int64),
+        'course_name': course_name,
+        'category_id': category_id,
+        'content_type': content_type,
+        'difficulty': difficulty,
+        'rating': np.round(rng.uniform(3.5, 5.0, n_courses), 1),
+        'average_time': rng.integers(20, 101, n_courses),
+        'features': (pd.Series(technology) + ' course covering: ' + pd.Series(features)
+                     + '. Perfect for ' + pd.Series(difficulty) + ' learners. Includes '
+                     + pd.Series(content_type) + ' content.')
+    })
+
+
+def popularity_weights(rng: np.random.Generator, n: int, skew: float) -> np.ndarray:
+    """
+    Zipf-like weights: the k-th most popular item gets weight 1 / k**skew.
+    Ranks are shuffled so popularity does not follow id order.
+    """
+    weights = 1.0 / np.arange(1, n + 1) ** skew
+    rng.shuffle(weights)
+    return weights / weights.sum()
+
+
+def activity_weights(rng: np.random.Generator, n: int, sigma: float) -> np.ndarray:
+    """
+    Log-normal weights: most students are occasional, a long tail is very active.
+    """
+    weights = rng.lognormal(0.0, sigma, n)
+    return weights / weights.sum()
+
+
+def generate_engagement(rng: np.random.Generator, students: np.ndarray, courses: pd.DataFrame,
+                        n_interactions: int, chunk_size: int, popularity_skew: float,
+                        activity_sigma: float) -> Iterator[pd.DataFrame]:
+    """
+    Yields interactions in chunks. A student may take the same course more
+    than once, as in the engagement log; the engine keeps the latest rating.
+    """
+    student_cdf = np.cumsum(activity_weights(rng, len(students), activity_sigma))
+    course_cdf = np.cumsum(popularity_weights(rng, len(courses), popularity_skew))
+    course_ids = courses['course_id'].to_numpy()
+    course_names = pd.Categorical(courses['course_name'])
+    average_time = courses['average_time'].to_numpy(dtype=float)
+
+    for start, stop in _chunks(n_interactions, chunk_size):
+        n = stop - start
+        # Inverse CDF sampling; same as rng.choice(p=...) without re-validating p every chunk
+        student = np.minimum(np.searchsorted(student_cdf, rng.random(n), side='right'), len(students) - 1)
+        course = np.minimum(np.searchsorted(course_cdf, rng.random(n), side='right'), len(courses) - 1)
+
+        time_spent = np.clip(rng.normal(0.7, 0.2, n) * average_time[course], 1, 100)
+        completion_status = np.asarray(COMPLETION_LEVELS)[rng.choice(len(COMPLETION_LEVELS), size=n, p=COMPLETION_WEIGHTS)]
+        quiz_score = np.where(completion_status > 0, np.clip(rng.normal(0.7, 0.15, n) * 100, 0, 100), 0)
+        base_rating = (completion_status * 0.5 + quiz_score / 100 * 0.5) * 5
+        rating = np.clip(rng.normal(base_rating, 0.5), 1, 5)
+
+        yield pd.DataFrame({
+            'student_id': students[student],
+            'course_id': course_ids[course],
+            'course_name': course_names.take(course),
+            'time_spent': np.round(time_spent, 2),
+            'quiz_score': np.round(quiz_score, 2),
+            'completion_status': completion_status,
+            'rating': np.round(rating, 1)
+        })
+
+
+class FileSink:
+    """
+    Appends chunks of one dataset to a CSV, Feather or Parquet file. The file
+    is written aside and renamed into place on close, like write_frame.
+    """
+
+    def __init__(self, path: str, name: str):
+        self.path = path
+        self.name = name
+        self.format = os.path.splitext(path)[1].lstrip('.')
+        self.tmp_path = path + '.tmp'
+        self.rows = 0
+        self._writer = None
+
+    def write(self, frame: pd.DataFrame) -> None:
+        frame = apply_schema(frame, self.name)
+        if self.format == 'csv':
+            frame.to_csv(self.tmp_path, mode='w' if self.rows == 0 else 'a', header=self.rows == 0, index=False)
+        else:
+            import pyarrow as pa
+            table = pa.Table.from_pandas(frame, preserve_index=False)
+            if self._writer is None:
+                if self.format == 'feather':
+                    # Uncompressed, so the file can be memory-mapped on load
+                    self._writer = pa.ipc.new_file(self.tmp_path, table.schema)
+                else:
+                    import pyarrow.parquet as pq
+                    self._writer = pq.ParquetWriter(self.tmp_path, table.schema)
+            self._writer.write_table(table)
+        self.rows += len(frame)
+
+    def close(self) -> None:
+        if self._writer is not None:
+            self._writer.close()
+        if self.rows:
+            os.replace(self.tmp_path, self.path)
+
+
+class DatabaseSink:
+    """
+    Inserts chunks of one dataset into its table, one transaction per chunk.
+    """
+
+    def __init__(self, sql_engine, name: str):
+        self.sql_engine = sql_engine
+        self.name = name
+        self.rows = 0
+        if name == 'students':
+            from werkzeug.security import generate_password_hash
+            # One shared hash; hashing a password per generated student would dominate the run
+            self.password = generate_password_hash('password')
+
+    def write(self, frame: pd.DataFrame) -> None:
+        import db_source
+        from models import Course, Engagement, Student
+        if self.name == 'students':
+            frame = pd.DataFrame({
+                'id': frame['student_id'],
+                'full_name': frame['full_name'],
+                'email': frame['email'],
+                'password': self.password,
+                'interests': frame['interests'].str.split(','),
+                'skill_level': frame['skill_level'],
+                'created_at': pd.to_datetime(frame['registration_date'])
+            })
+            table = Student.__table__
+        elif self.name == 'courses':
+            table = Course.__table__
+        else:
+            table = Engagement.__table__
+        db_source.insert_frame(self.sql_engine, table, frame)
+        self.rows += len(frame)
+
+    def close(self) -> None:
+        pass
+
+
+def open_sinks(output: str, output_format: str) -> Dict[str, object]:
+    if output_format == 'database':
+        from sqlalchemy import create_engine
+        from config import Config
+        sql_engine = create_engine(Config.SQLALCHEMY_DATABASE_URI)
+        return {name: DatabaseSink(sql_engine, name) for name in ('students', 'courses', 'engagement')}
+    os.makedirs(output, exist_ok=True)
+    return {
+        name: FileSink(dataset_path(os.path.join(output, f'{name}.csv'), output_format), name)
+        for name in ('students', 'courses', 'engagement')
+    }
+
+
+def generate(n_students: int, n_courses: int, n_interactions: int, seed: int, output: str,
+             output_format: str, chunk_size: int = 1_000_000, popularity_skew: float = 1.0,
+             activity_sigma: float = 1.0) -> Dict[str, int]:
+    """
+    Generates students, courses and interactions and writes them chunk by
+    chunk. The same seed and chunk size always produce the same data.
+    Returns the number of rows written per dataset.
+    """
+    rng = np.random.default_rng(seed)
+    sinks = open_sinks(output, output_format)
+    try:
+        # Students and courses first, so database foreign keys resolve
+        for frame in generate_students(rng, n_students, 1001, chunk_size):
+            sinks['students'].write(frame)
+        courses = generate_courses(rng, n_courses, 1001)
+        for start, stop in _chunks(n_courses, chunk_size):
+            sinks['courses'].write(courses.iloc[start:stop])
+
+        students = np.arange(1001, 1001 + n_students, dtype=np.int64)
+        started = time.perf_counter()
+        for frame in generate_engagement(rng, students, courses, n_interactions, chunk_size,
+                                         popularity_skew, activity_sigma):
+            sinks['engagement'].write(frame)
+            elapsed = time.perf_counter() - started
+            logger.info(f"Wrote {sinks['engagement'].rows}/{n_interactions} interactions "
+                        f"({sinks['engagement'].rows / max(elapsed, 1e-9):.0f} rows/s)")
+    finally:
+        for sink in sinks.values():
+            sink.close()
+    return {name: sink.rows for name, sink in sinks.items()}
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Generate synthetic students, courses and interactions at any scale.')
+    parser.add_argument('--students', type=int, default=100, help='number of students')
+    parser.add_argument('--courses', type=int, default=200, help='number of courses')
+    parser.add_argument('--interactions', type=int, default=1000, help='number of engagement rows')
+    parser.add_argument('--seed', type=int, default=42, help='random seed')
+    from config import Config
+    parser.add_argument('--format', choices=FORMATS + ('database',), default=Config.DATASET_FORMAT,
+                        help="file format to write, or 'database' to insert into SQLALCHEMY_DATABASE_URI; "
+                             "defaults to the engine's DATASET_FORMAT")
+    parser.add_argument('--output', default=data_dir, help='directory for the generated files')
+    parser.add_argument('--chunk-size', type=int, default=1_000_000, help='rows generated and written at a time')
+    parser.add_argument('--popularity-skew', type=float, default=1.0,
+                        help='Zipf exponent of course popularity; 0 makes every course equally likely')
+    parser.add_argument('--activity-sigma', type=float, default=1.0,
+                        help='log-normal sigma of student activity; 0 makes every student equally active')
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO)
+    written = generate(args.students, args.courses, args.interactions, args.seed, args.output, args.format,
+                       chunk_size=args.chunk_size, popularity_skew=args.popularity_skew,
+                       activity_sigma=args.activity_sigma)
+    print(', '.join(f'{rows} {name}' for name, rows in written.items()))
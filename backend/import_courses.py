@@ -1,6 +1,8 @@
+import os
+# Only the database is needed here, so skip building the recommendation engine
+os.environ.setdefault('ENGINE_STARTUP', 'off')
 import pandas as pd
 from app import db, Course, app  # Ensure you import 'app'
-import os
 
 def import_courses():
     base_dir = os.path.dirname(os.path.abspath(__file__))
@@ -0,0 +1,100 @@
+from typing import Dict, Iterable, Iterator, List, Set, Tuple
+import csv
+import json
+import numpy as np
+import pandas as pd
+
+INTERACTION_FIELDS = ('student_id', 'course_id', 'time_spent', 'quiz_score', 'completion_status', 'rating')
+ID_FIELDS = ('student_id', 'course_id')
+
+# A chunk of parsed rows indexed by their line in the body, and the lines that could not be parsed
+Chunk = Tuple[pd.DataFrame, List[Dict]]
+
+
+def iter_ndjson_chunks(lines: Iterable[bytes], chunk_size: int) -> Iterator[Chunk]:
+    """
+    Parses a stream of JSON lines into frames of at most `chunk_size` rows.
+    Blank lines are skipped; lines that are not JSON objects are rejected.
+    """
+    records, line_numbers, rejects = [], [], []
+    for line_number, line in enumerate(lines, start=1):
+        if not line.strip():
+            continue
+        try:
+            record = json.loads(line)
+        except ValueError:
+            rejects.append({'line': line_number, 'error': 'Invalid JSON'})
+            continue
+        if not isinstance(record, dict):
+            rejects.append({'line': line_number, 'error': 'Expected a JSON object'})
+            continue
+        records.append(record)
+        line_numbers.append(line_number)
+        if len(records) >= chunk_size:
+            yield pd.DataFrame.from_records(records, index=line_numbers), rejects
+            records, line_numbers, rejects = [], [], []
+    if records or rejects:
+        yield pd.DataFrame.from_records(records, index=line_numbers), rejects
+
+
+def iter_csv_chunks(lines: Iterable[bytes], chunk_size: int) -> Iterator[Chunk]:
+    """
+    Parses a CSV stream with a header row into frames of at most
+    `chunk_size` rows of strings. Rows with the wrong number of fields are rejected.
+    """
+    reader = csv.reader(line.decode('utf-8', errors='replace') for line in lines)
+    header = next(reader, None)
+    if header is None:
+        return
+    header = [name.strip() for name in header]
+    rows, line_numbers, rejects = [], [], []
+    for row in reader:
+        if not row:
+            continue
+        if len(row) != len(header):
+            rejects.append({'line': reader.line_num, 'error': f"Expected {len(header)} fields, got {len(row)}"})
+            continue
+        rows.append(row)
+        line_numbers.append(reader.line_num)
+        if len(rows) >= chunk_size:
+            yield pd.DataFrame(rows, columns=header, index=line_numbers), rejects
+            rows, line_numbers, rejects = [], [], []
+    if rows or rejects:
+        yield pd.DataFrame(rows, columns=header, index=line_numbers), rejects
+
+
+def validate_interactions(interactions: pd.DataFrame, student_ids: Set, course_ids: Set) -> Tuple[pd.DataFrame, pd.Series]:
+    """
+    Validates a chunk of interactions column by column. Every field must be
+    present and numeric, ids must be whole numbers of a known student and
+    course, and ratings must lie in 1-5.
+
+    Returns the valid rows, typed and restricted to INTERACTION_FIELDS, and
+    the first error of each rejected row, both indexed like `interactions`.
+    """
+    errors = pd.Series(None, index=interactions.index, dtype=object)
+
+    def reject(mask, message: str) -> None:
+        errors[np.asarray(mask) & errors.isna().to_numpy()] = message
+
+    values = {}
+    for field in INTERACTION_FIELDS:
+        raw = interactions[field] if field in interactions.columns else pd.Series(np.nan, index=interactions.index)
+        values[field] = pd.to_numeric(raw, errors='coerce').astype(float)
+        missing = raw.isna() | raw.eq('')
+        reject(missing, f"Missing {field}")
+        reject(values[field].isna(), f"Invalid {field}")
+    for field in ID_FIELDS:
+        reject(values[field] % 1 != 0, f"Invalid {field}")
+    reject(~values['rating'].between(1, 5), 'Rating out of range')
+
+    # Hash set lookups, one per row still valid
+    for field, known in (('student_id', student_ids), ('course_id', course_ids)):
+        pending = errors.isna().to_numpy()
+        found = np.zeros(len(interactions), dtype=bool)
+        found[pending] = [int(value) in known for value in values[field][pending].tolist()]
+        reject(pending & ~found, f"Unknown {field}")
+
+    valid = errors.isna().to_numpy()
+    frame = pd.DataFrame({field: values[field][valid] for field in INTERACTION_FIELDS})
+    return frame.astype({field: 'int64' for field in ID_FIELDS}), errors.dropna()
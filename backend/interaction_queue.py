@@ -0,0 +1,98 @@
+from queue import Empty, Full, Queue
+from threading import Event, Thread
+from typing import Callable, Dict, List, Optional
+import logging
+import time
+from prometheus_client import Counter, Gauge, Histogram
+
+logger = logging.getLogger(__name__)
+
+INTERACTION_QUEUE_DEPTH = Gauge('interaction_queue_depth', 'Interactions accepted but not yet applied')
+INTERACTION_QUEUE_REJECTED = Counter('interaction_queue_rejected_total', 'Interactions refused because the queue was full')
+INTERACTION_BATCH_SIZE = Histogram(
+    'interaction_batch_size', 'Interactions applied per micro-batch', buckets=(1, 10, 50, 100, 250, 500, 1000, 5000)
+)
+
+
+class InteractionQueue:
+    """
+    Bounded write-behind queue in front of the engine's interaction write path.
+
+    `submit` only enqueues, so callers are acknowledged without waiting for
+    the write. A consumer thread hands queued interactions to `apply_batch`
+    in micro-batches: a batch closes once it holds `batch_size` events or
+    `max_delay` seconds after its first event arrived. When the queue is
+    full, `submit` blocks for up to `put_timeout` seconds and then raises
+    queue.Full, so producers slow down instead of growing memory. Events
+    still queued when the process dies are lost; `stop` drains the queue.
+    """
+
+    def __init__(self, apply_batch: Callable[[List[Dict]], None], max_size: int = 10000,
+                 batch_size: int = 500, max_delay: float = 0.05, put_timeout: float = 0.5):
+        self.apply_batch = apply_batch
+        self.batch_size = batch_size
+        self.max_delay = max_delay
+        self.put_timeout = put_timeout
+        self._queue: "Queue[Dict]" = Queue(maxsize=max_size)
+        self._stop = Event()
+        self._worker: Optional[Thread] = None
+
+    def submit(self, record: Dict) -> None:
+        try:
+            self._queue.put(record, timeout=self.put_timeout)
+        except Full:
+            INTERACTION_QUEUE_REJECTED.inc()
+            raise
+        INTERACTION_QUEUE_DEPTH.inc()
+
+    def __len__(self) -> int:
+        return self._queue.qsize()
+
+    def join(self) -> None:
+        """
+        Blocks until every interaction submitted so far has been applied.
+        """
+        self._queue.join()
+
+    def start(self) -> None:
+        if self._worker is None:
+            self._worker = Thread(target=self._run, name='interaction-queue', daemon=True)
+            self._worker.start()
+
+    def stop(self) -> None:
+        """
+        Stops the consumer once everything already queued has been applied.
+        """
+        self._stop.set()
+        if self._worker is not None:
+            self._worker.join()
+
+    def _run(self) -> None:
+        while not (self._stop.is_set() and self._queue.empty()):
+            batch = self._next_batch()
+            if not batch:
+                continue
+            INTERACTION_QUEUE_DEPTH.dec(len(batch))
+            INTERACTION_BATCH_SIZE.observe(len(batch))
+            try:
+                self.apply_batch(batch)
+            except Exception as e:
+                logger.error(f"Failed to apply {len(batch)} queued interactions: {e}")
+            finally:
+                for _ in batch:
+                    self._queue.task_done()
+
+    def _next_batch(self) -> List[Dict]:
+        try:
+            # Wakes up periodically so a stop request is noticed on an idle queue
+            batch = [self._queue.get(timeout=0.5)]
+        except Empty:
+            return []
+        deadline = time.monotonic() + self.max_delay
+        while len(batch) < self.batch_size:
+            remaining = deadline - time.monotonic()
+            try:
+                batch.append(self._queue.get(timeout=remaining) if remaining > 0 else self._queue.get_nowait())
+            except Empty:
+                break
+        return batch
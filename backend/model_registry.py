@@ -0,0 +1,229 @@
+from contextlib import contextmanager
+from threading import RLock
+from typing import Dict, Iterator, List, Optional
+import fcntl
+import json
+import logging
+import os
+import shutil
+import time
+import numpy as np
+from scipy.sparse import csr_matrix
+from sklearn.feature_extraction.text import TfidfVectorizer
+from cf_scoring import FactorScorer
+
+logger = logging.getLogger(__name__)
+
+MANIFEST_NAME = 'manifest.json'
+CURRENT_NAME = 'CURRENT'
+LOCK_NAME = 'registry.lock'
+TRAINER_LOCK_NAME = 'trainer.lock'
+RETRAIN_REQUEST_NAME = 'RETRAIN_REQUESTED'
+FORMAT_VERSION = 1
+
+
+class ModelRegistry:
+    """
+    Versioned on-disk store for model artifacts.
+
+    Each version is a directory of raw .npy arrays (SVD factors and biases,
+    the neighbour graph's CSR arrays, TF-IDF idf weights) plus a small JSON
+    manifest holding the scalars and the vectorizer vocabulary. Arrays are
+    opened with mmap_mode='r', so every worker process serving the same
+    version shares one page-cache copy instead of unpickling its own. A
+    version is written to a temporary directory, renamed into place and only
+    then published through the CURRENT pointer file.
+
+    Worker processes share the registry: saves are serialized by an exclusive
+    file lock, and one process at a time holds the trainer lock and is the
+    only one that retrains; the others ask it to through a request file and
+    reload whatever CURRENT points to.
+    """
+
+    def __init__(self, root: str, keep: int = 3):
+        self.root = root
+        self.keep = keep
+        self._lock = RLock()
+        self._lock_depth = 0
+        self._lock_file = None
+        self._trainer_lock_file = None
+        os.makedirs(self.root, exist_ok=True)
+
+    @contextmanager
+    def lock(self) -> Iterator[None]:
+        """
+        Holds the registry lock against other processes. Reentrant within a process.
+        """
+        with self._lock:
+            if self._lock_depth == 0:
+                self._lock_file = open(os.path.join(self.root, LOCK_NAME), 'a')
+                fcntl.flock(self._lock_file, fcntl.LOCK_EX)
+            self._lock_depth += 1
+            try:
+                yield
+            finally:
+                self._lock_depth -= 1
+                if self._lock_depth == 0:
+                    self._lock_file.close()
+                    self._lock_file = None
+
+    def claim_trainer(self) -> bool:
+        """
+        Tries to become the process that retrains. Once claimed, the trainer
+        lock is held until the process exits.
+        """
+        if self._trainer_lock_file is None:
+            lock_file = open(os.path.join(self.root, TRAINER_LOCK_NAME), 'a')
+            try:
+                fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except BlockingIOError:
+                lock_file.close()
+                return False
+            self._trainer_lock_file = lock_file
+        return True
+
+    def request_retrain(self) -> None:
+        open(os.path.join(self.root, RETRAIN_REQUEST_NAME), 'a').close()
+
+    def take_retrain_request(self) -> bool:
+        try:
+            os.remove(os.path.join(self.root, RETRAIN_REQUEST_NAME))
+        except FileNotFoundError:
+            return False
+        return True
+
+    def current_version(self) -> Optional[str]:
+        current_path = os.path.join(self.root, CURRENT_NAME)
+        if not os.path.exists(current_path):
+            return None
+        with open(current_path, encoding='utf-8') as current:
+            version = current.read().strip()
+        return version if os.path.exists(os.path.join(self.root, version, MANIFEST_NAME)) else None
+
+    def save(self, cf_scorer: FactorScorer, tfidf_vectorizer: TfidfVectorizer, cbf_model: csr_matrix,
+             snapshot_time: Optional[float] = None) -> str:
+        """
+        Saves and publishes a new version. `snapshot_time` is when the
+        training data was copied (defaults to now).
+        """
+        with self.lock():
+            return self._save(cf_scorer, tfidf_vectorizer, cbf_model, snapshot_time)
+
+    def _save(self, cf_scorer: FactorScorer, tfidf_vectorizer: TfidfVectorizer, cbf_model: csr_matrix,
+              snapshot_time: Optional[float]) -> str:
+        version = self._next_version()
+        tmp_dir = os.path.join(self.root, f'.{version}.tmp')
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+        os.makedirs(tmp_dir)
+
+        arrays = {
+            'cf_user_ids': np.asarray(cf_scorer.user_ids),
+            'cf_user_factors': cf_scorer.user_factors,
+            'cf_user_bias': cf_scorer.user_bias,
+            'cf_course_ids': np.asarray(cf_scorer.course_ids),
+            'cf_item_factors': cf_scorer.item_factors,
+            'cf_item_bias': cf_scorer.item_bias,
+            'cbf_data': cbf_model.data,
+            'cbf_indices': cbf_model.indices,
+            'cbf_indptr': cbf_model.indptr,
+            'tfidf_idf': tfidf_vectorizer.idf_
+        }
+        for name, array in arrays.items():
+            np.save(os.path.join(tmp_dir, f'{name}.npy'), np.ascontiguousarray(array))
+
+        params = tfidf_vectorizer.get_params()
+        manifest = {
+            'format': FORMAT_VERSION,
+            'version': version,
+            'created_at': time.time(),
+            'snapshot_time': time.time() if snapshot_time is None else snapshot_time,
+            'arrays': sorted(arrays),
+            'cf': {
+                'global_mean': float(cf_scorer.global_mean),
+                'rating_scale': list(cf_scorer.rating_scale)
+            },
+            'cbf': {'shape': list(cbf_model.shape)},
+            'tfidf': {
+                'params': {
+                    key: value for key, value in params.items()
+                    if key not in ('vocabulary', 'dtype') and isinstance(value, (str, int, float, bool, list, tuple, type(None)))
+                },
+                'dtype': np.dtype(params['dtype']).name,
+                'vocabulary': {term: int(index) for term, index in tfidf_vectorizer.vocabulary_.items()}
+            }
+        }
+        with open(os.path.join(tmp_dir, MANIFEST_NAME), 'w', encoding='utf-8') as manifest_file:
+            json.dump(manifest, manifest_file)
+
+        os.rename(tmp_dir, os.path.join(self.root, version))
+        self._publish(version)
+        self._prune()
+        logger.info(f"Saved model version {version} to registry")
+        return version
+
+    def load(self, version: Optional[str] = None) -> Dict:
+        """
+        Opens a version (the current one by default) without copying its arrays into the heap.
+        """
+        version = version or self.current_version()
+        if version is None:
+            raise FileNotFoundError(f"No published model version in {self.root}")
+        version_dir = os.path.join(self.root, version)
+        with open(os.path.join(version_dir, MANIFEST_NAME), encoding='utf-8') as manifest_file:
+            manifest = json.load(manifest_file)
+        arrays = {
+            name: np.load(os.path.join(version_dir, f'{name}.npy'), mmap_mode='r')
+            for name in manifest['arrays']
+        }
+
+        cf_scorer = FactorScorer(
+            global_mean=manifest['cf']['global_mean'],
+            rating_scale=manifest['cf']['rating_scale'],
+            user_ids=arrays['cf_user_ids'],
+            user_factors=arrays['cf_user_factors'],
+            user_bias=arrays['cf_user_bias'],
+            course_ids=arrays['cf_course_ids'],
+            item_factors=arrays['cf_item_factors'],
+            item_bias=arrays['cf_item_bias']
+        )
+        cbf_model = csr_matrix(
+            (arrays['cbf_data'], arrays['cbf_indices'], arrays['cbf_indptr']),
+            shape=tuple(manifest['cbf']['shape'])
+        )
+
+        tfidf = manifest['tfidf']
+        params = dict(tfidf['params'])
+        if params.get('ngram_range') is not None:
+            params['ngram_range'] = tuple(params['ngram_range'])
+        tfidf_vectorizer = TfidfVectorizer(vocabulary=tfidf['vocabulary'], dtype=np.dtype(tfidf['dtype']).type, **params)
+        tfidf_vectorizer.idf_ = arrays['tfidf_idf']
+
+        return {
+            'version': version,
+            # Versions saved before the field existed fall back to their save time
+            'snapshot_time': manifest.get('snapshot_time', manifest['created_at']),
+            'cf_scorer': cf_scorer,
+            'tfidf_vectorizer': tfidf_vectorizer,
+            'cbf_model': cbf_model
+        }
+
+    def _versions(self) -> List[str]:
+        return sorted(
+            name for name in os.listdir(self.root)
+            if name.isdigit() and os.path.isdir(os.path.join(self.root, name))
+        )
+
+    def _next_version(self) -> str:
+        versions = self._versions()
+        return f'{int(versions[-1]) + 1 if versions else 1:06d}'
+
+    def _publish(self, version: str) -> None:
+        tmp_path = os.path.join(self.root, CURRENT_NAME + '.tmp')
+        with open(tmp_path, 'w', encoding='utf-8') as current:
+            current.write(version)
+        os.replace(tmp_path, os.path.join(self.root, CURRENT_NAME))
+
+    def _prune(self) -> None:
+        # Workers still mapping a removed version keep their pages until they reload
+        for version in self._versions()[:-self.keep]:
+            shutil.rmtree(os.path.join(self.root, version), ignore_errors=True)
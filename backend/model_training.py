@@ -0,0 +1,197 @@
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from threading import Event, Lock, Thread
+from typing import Any, Dict, Optional, Tuple
+import copy
+import logging
+import multiprocessing
+import time
+import pandas as pd
+from scipy.sparse import csr_matrix
+from sklearn.feature_extraction.text import TfidfVectorizer
+from surprise import Dataset, Reader, SVD
+from surprise.model_selection import train_test_split
+from cf_scoring import FactorScorer
+from course_similarity import top_k_similarity_graph
+
+logger = logging.getLogger(__name__)
+
+
+class ModelGeneration:
+    """
+    One consistent set of trained models together with the structures derived
+    from them. The engine publishes a generation with a single reference swap,
+    so readers never see CF and CBF models from different training runs.
+    """
+
+    def __init__(self, version: int, cf_scorer, tfidf_vectorizer, cbf_model, course_feature_matrix):
+        self.version = version
+        self.cf_scorer = cf_scorer
+        self.tfidf_vectorizer = tfidf_vectorizer
+        self.cbf_model = cbf_model
+        self.course_feature_matrix = course_feature_matrix
+        self.created_at = time.time()
+
+    def with_cf_scorer(self, cf_scorer) -> "ModelGeneration":
+        """
+        Returns this generation with online CF updates applied. The version
+        is kept, so cached results stay valid for the students whose scores
+        did not change; callers evict the ones that did.
+        """
+        generation = copy.copy(self)
+        generation.cf_scorer = cf_scorer
+        return generation
+
+
+def train_cf_model(engagement: pd.DataFrame, n_factors: int = 100) -> SVD:
+    reader = Reader(rating_scale=(1, 5))
+    data = Dataset.load_from_df(
+        engagement[['student_id', 'course_id', 'rating']],
+        reader
+    )
+    trainset, _ = train_test_split(data, test_size=0.2)
+    cf_model = SVD(n_factors=n_factors)
+    cf_model.fit(trainset)
+    logger.info("CF model trained successfully")
+    return cf_model
+
+
+def train_cbf_model(courses: pd.DataFrame, neighbours: int, block_size: int) -> Tuple[TfidfVectorizer, csr_matrix]:
+    tfidf_vectorizer = TfidfVectorizer(stop_words='english')
+    course_features = tfidf_vectorizer.fit_transform(courses['features'])
+    cbf_model = top_k_similarity_graph(course_features, k=neighbours, block_size=block_size)
+    logger.info("CBF model trained successfully")
+    return tfidf_vectorizer, cbf_model
+
+
+def train_models(engagement: pd.DataFrame, courses: pd.DataFrame, n_factors: int = 100,
+                 neighbours: int = 50, block_size: int = 256) -> Dict[str, Any]:
+    """
+    Trains a full CF/CBF model set. Kept at module level so it can run in a worker process.
+    Only the SVD factors are returned, aligned with the order of `courses`.
+    """
+    tfidf_vectorizer, cbf_model = train_cbf_model(courses, neighbours, block_size)
+    cf_model = train_cf_model(engagement, n_factors)
+    return {
+        'cf_scorer': FactorScorer.from_svd(cf_model, courses['course_id'].tolist()),
+        'tfidf_vectorizer': tfidf_vectorizer,
+        'cbf_model': cbf_model
+    }
+
+
+class RetrainScheduler:
+    """
+    Retrains the engine's models in a separate process and hot-swaps the result.
+
+    A retrain runs every `interval` seconds, after `interaction_threshold` new
+    interactions, after `catalog_threshold` incremental course updates (which
+    also refits the TF-IDF vocabulary), or when triggered explicitly. Training
+    works on a copy of the engine's data taken when the run starts; the engine
+    keeps serving the current generation until the new one is activated, and a
+    run whose catalog changed underneath it is discarded and started again.
+    `training_options` are passed through to train_models.
+
+    When several worker processes share the model registry, only the one
+    holding its trainer lock retrains; the others forward their triggers as
+    retrain requests and every `reload_interval` seconds reload the version
+    CURRENT points to.
+    """
+
+    def __init__(self, engine, interval: float = 86400.0, interaction_threshold: int = 1000,
+                 catalog_threshold: int = 100, reload_interval: float = 30.0, **training_options):
+        self.engine = engine
+        self.interval = interval
+        self.reload_interval = reload_interval
+        self.interaction_threshold = interaction_threshold
+        self.catalog_threshold = catalog_threshold
+        self.training_options = training_options
+        self._interactions = 0
+        self._catalog_changes = 0
+        self._lock = Lock()
+        self._trigger = Event()
+        self._stop = Event()
+        self._worker: Optional[Thread] = None
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._trainer = False
+
+    def start(self) -> None:
+        if self._worker is None:
+            self._executor = self._create_executor()
+            self._worker = Thread(target=self._run, name='model-retrain', daemon=True)
+            self._worker.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        self._trigger.set()
+        if self._worker is not None:
+            self._worker.join()
+        if self._executor is not None:
+            self._executor.shutdown(cancel_futures=True)
+
+    def trigger(self) -> None:
+        self._trigger.set()
+
+    def record_interactions(self, count: int = 1) -> None:
+        with self._lock:
+            self._interactions += count
+            if self._interactions >= self.interaction_threshold:
+                self._trigger.set()
+
+    def record_catalog_changes(self, count: int = 1) -> None:
+        with self._lock:
+            self._catalog_changes += count
+            if self._catalog_changes >= self.catalog_threshold:
+                self._trigger.set()
+
+    @staticmethod
+    def _create_executor() -> ProcessPoolExecutor:
+        # Spawn rather than fork: the parent holds locks and threads a fork would copy mid-state
+        return ProcessPoolExecutor(max_workers=1, mp_context=multiprocessing.get_context('spawn'))
+
+    def _run(self) -> None:
+        registry = self.engine.model_registry
+        next_retrain = time.monotonic() + self.interval
+        while not self._stop.is_set():
+            triggered = self._trigger.wait(self.reload_interval)
+            if self._stop.is_set():
+                break
+            self._trigger.clear()
+            try:
+                if not self._trainer:
+                    self._trainer = registry.claim_trainer()
+                if not self._trainer:
+                    if triggered:
+                        registry.request_retrain()
+                    self.engine.reload_models()
+                elif triggered or registry.take_retrain_request() or time.monotonic() >= next_retrain:
+                    next_retrain = time.monotonic() + self.interval
+                    self.retrain()
+            except Exception as e:
+                logger.error(f"Background retraining failed: {e}")
+
+    def retrain(self) -> None:
+        with self._lock:
+            self._interactions = 0
+            self._catalog_changes = 0
+        snapshot_time = time.time()
+        engagement, courses = self.engine.training_snapshot()
+        logger.info(f"Retraining models on {len(engagement)} interactions in a worker process")
+        started = time.perf_counter()
+        try:
+            models = self._executor.submit(train_models, engagement, courses, **self.training_options).result()
+        except BrokenProcessPool:
+            # The training process died (e.g. killed for memory); later runs need a fresh pool
+            self._executor = self._create_executor()
+            raise
+        elapsed = time.perf_counter() - started
+        generation = self.engine.save_and_activate_models(
+            training_seconds=elapsed,
+            snapshot_time=snapshot_time,
+            course_ids=courses['course_id'].to_numpy(),
+            **models
+        )
+        if generation is None:
+            logger.info("Catalog changed while retraining; scheduling another run")
+            self._trigger.set()
+            return
+        logger.info(f"Model generation {generation.version} active after {elapsed:.1f}s")
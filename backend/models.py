@@ -88,6 +88,7 @@ class Engagement(db.Model):
     quiz_score = db.Column(db.Float, nullable=False)
     completion_status = db.Column(db.Float, nullable=False)
     rating = db.Column(db.Float, nullable=True)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow, server_default=db.func.now())
     
     student = db.relationship('Student', backref='engagements')
     course = db.relationship('Course', backref='engagements')
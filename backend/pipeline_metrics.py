@@ -0,0 +1,32 @@
+import time
+from prometheus_client import Gauge, Histogram
+
+# Kept free of pandas and the engine so the app can import it before the engine is built.
+# Process RSS, CPU and open fds come from prometheus_client's default process collector.
+RECOMMENDATION_STAGE_LATENCY = Histogram(
+    'recommendation_stage_seconds', 'Time spent in each stage of serving recommendations', ['stage']
+)
+DATASET_ROWS = Gauge('dataset_rows', 'Rows currently held by the recommendation engine', ['dataset'])
+MODEL_GENERATION = Gauge('model_generation', 'Version of the active model generation')
+MODEL_GENERATION_AGE = Gauge('model_generation_age_seconds', 'Seconds since the active model generation was activated')
+USER_ITEM_MATRIX_NNZ = Gauge('user_item_matrix_nnz', 'Stored ratings in the student x course matrix')
+
+
+def stage_timer(stage: str):
+    """
+    Times one pipeline stage, e.g. `with stage_timer('cf_scoring'): ...`.
+    """
+    return RECOMMENDATION_STAGE_LATENCY.labels(stage=stage).time()
+
+
+def track_engine(engine) -> None:
+    """
+    Binds the dataset and model gauges to `engine`. They are read from the
+    current snapshot when scraped, so nothing has to keep them up to date.
+    """
+    DATASET_ROWS.labels(dataset='students').set_function(lambda: len(engine.valid_student_ids))
+    DATASET_ROWS.labels(dataset='courses').set_function(lambda: len(engine.snapshot.courses))
+    DATASET_ROWS.labels(dataset='engagement').set_function(lambda: engine.snapshot.engagement_rows)
+    MODEL_GENERATION.set_function(lambda: engine.snapshot.models.version)
+    MODEL_GENERATION_AGE.set_function(lambda: time.time() - engine.snapshot.models.created_at)
+    USER_ITEM_MATRIX_NNZ.set_function(lambda: engine.user_item_matrix.nnz)
@@ -0,0 +1,88 @@
+from collections import OrderedDict
+from threading import Lock
+from typing import Any, Dict, Hashable, Optional, Set, Tuple
+import time
+
+
+class RecommendationCache:
+    """
+    Bounded LRU cache with a TTL for top-N recommendation results.
+
+    Entries are keyed by (student_id, n, version) so a model reload only has
+    to bump the version for stale results to become unreachable, and a
+    per-student key index lets a single student's entries be evicted without
+    touching anyone else's.
+
+    Each eviction also stamps the student with a new generation from a global
+    counter. A caller reads the generation before it takes the data it
+    computes from and passes it to `set`; a result computed from data older
+    than an eviction is dropped instead of being cached for the full TTL.
+    Only the `max_size` most recent stamps are kept: students stamped before
+    that read the floor, the newest stamp pruned, which is still newer than
+    any generation read before their last eviction.
+    """
+
+    def __init__(self, max_size: int = 10000, ttl: float = 300.0):
+        self.max_size = max_size
+        self.ttl = ttl
+        self._entries: "OrderedDict[Tuple, Tuple[float, Any]]" = OrderedDict()
+        self._student_keys: Dict[Hashable, Set[Tuple]] = {}
+        self._generations: "OrderedDict[Hashable, int]" = OrderedDict()
+        self._generation_counter = 0
+        self._generation_floor = 0
+        self._lock = Lock()
+
+    def generation(self, student_id: Hashable) -> int:
+        with self._lock:
+            return self._generations.get(student_id, self._generation_floor)
+
+    def get(self, student_id: Hashable, n: int, version: int) -> Optional[Any]:
+        key = (student_id, n, version)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            expires_at, value = entry
+            if expires_at < time.monotonic():
+                self._discard(key)
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, student_id: Hashable, n: int, version: int, value: Any, generation: Optional[int] = None) -> None:
+        key = (student_id, n, version)
+        with self._lock:
+            if generation is not None and self._generations.get(student_id, self._generation_floor) != generation:
+                return
+            self._entries[key] = (time.monotonic() + self.ttl, value)
+            self._entries.move_to_end(key)
+            self._student_keys.setdefault(student_id, set()).add(key)
+            while len(self._entries) > self.max_size:
+                oldest_key = next(iter(self._entries))
+                self._discard(oldest_key)
+
+    def evict_student(self, student_id: Hashable) -> None:
+        with self._lock:
+            self._generation_counter += 1
+            self._generations[student_id] = self._generation_counter
+            self._generations.move_to_end(student_id)
+            while len(self._generations) > self.max_size:
+                _, self._generation_floor = self._generations.popitem(last=False)
+            for key in self._student_keys.pop(student_id, set()):
+                self._entries.pop(key, None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._student_keys.clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def _discard(self, key: Tuple) -> None:
+        self._entries.pop(key, None)
+        keys = self._student_keys.get(key[0])
+        if keys is not None:
+            keys.discard(key)
+            if not keys:
+                del self._student_keys[key[0]]
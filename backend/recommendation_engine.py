@@ -0,0 +1,1076 @@
+import pandas as pd
+import numpy as np
+import asyncio
+import os
+from threading import Lock, Thread
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import nullcontext
+from itertools import islice
+from typing import Callable, ContextManager, Iterator, List, Dict, Optional, Set, Tuple, Union
+from prometheus_client import Histogram, Counter, Gauge
+import time
+from sqlalchemy import create_engine
+from models import Student
+from config import Config
+from recommendation_cache import RecommendationCache
+from user_item_matrix import UserItemMatrix
+from cf_scoring import FactorScorer
+from engagement_log import EngagementLog
+from engagement_aggregates import (
+    ContentPerformanceAggregates, StudentEngagementScores, StudentProgressProfiles, optional_mean
+)
+from engagement_store import EngagementStore
+from engagement_tailer import EngagementTailer
+from engine_snapshot import EngineSnapshot
+from interaction_ingest import validate_interactions
+from interaction_queue import InteractionQueue
+from pipeline_metrics import stage_timer, track_engine
+from model_training import ModelGeneration, RetrainScheduler, train_models
+from model_registry import ModelRegistry
+from course_similarity import replace_rows, update_similarity_graph
+from dataset_store import apply_schema, dataset_path, load_dataset, upsert_rows
+import db_source
+
+logger = logging.getLogger(__name__)
+
+# Monitoring setup
+RECOMMENDATION_LATENCY = Histogram('recommendation_latency_seconds', 'Time spent processing recommendations')
+RECOMMENDATION_CACHE_HITS = Counter('recommendation_cache_hits_total', 'Recommendation requests served from the result cache')
+RECOMMENDATION_CACHE_MISSES = Counter('recommendation_cache_misses_total', 'Recommendation requests that had to be computed')
+ENGAGEMENT_SCORE_GAUGE = Gauge('engagement_score_average', 'Average engagement score across all students')
+MODEL_TRAINING_DURATION = Histogram('model_training_duration_seconds', 'Time spent training models')
+INTERACTION_COUNTER = Counter('interaction_total', 'Total number of logged interactions')
+base_dir = os.path.dirname(os.path.abspath(__file__))
+data_dir = os.path.join(base_dir, 'data')
+
+# Ensure the data directory exists
+os.makedirs(data_dir, exist_ok=True)
+
+# CSV exports; the engine itself reads and writes the Config.DATASET_FORMAT snapshots next to them
+students_path = os.path.join(data_dir, 'students.csv')
+courses_path = os.path.join(data_dir, 'courses.csv')
+engagement_path = os.path.join(data_dir, 'engagement.csv')
+engagement_log_dir = os.path.join(data_dir, 'engagement_log')
+model_registry_dir = os.path.join(base_dir, 'model_registry')
+# Ordinal ranks used to compare course difficulty with student skill level
+SKILL_LEVELS = {'beginner': 0, 'intermediate': 1, 'advanced': 2}
+
+
+class RecommendationEngine:
+    def __init__(self, startup_phase: Callable[[str], ContextManager] = None):
+        # Lets the caller time each stage of construction for its readiness report
+        startup_phase = startup_phase or (lambda name: nullcontext())
+        self.data_lock = Lock()
+        self.snapshot: Optional[EngineSnapshot] = None
+        self.recommendation_cache = RecommendationCache(
+            max_size=Config.RECOMMENDATION_CACHE_SIZE,
+            ttl=Config.RECOMMENDATION_CACHE_TTL
+        )
+        self.valid_student_ids = set()
+        # When each student last had interactions applied, oldest first, so a
+        # new model generation can fold in the ones its training data missed
+        self._student_updated_at: Dict[int, float] = {}
+        self.cbf_pool = ThreadPoolExecutor(max_workers=Config.RECOMMENDATION_WORKERS)
+        # With the database as the source, the log is a write-ahead log for inserts into the engagements table
+        self.sql_engine = create_engine(Config.SQLALCHEMY_DATABASE_URI) if Config.DATASET_SOURCE == 'database' else None
+        self.engagement_log = EngagementLog(
+            dataset_path(engagement_path, Config.DATASET_FORMAT),
+            engagement_log_dir,
+            fsync_batch=Config.ENGAGEMENT_LOG_FSYNC_BATCH,
+            fsync_interval=Config.ENGAGEMENT_LOG_FSYNC_INTERVAL,
+            compaction_interval=Config.ENGAGEMENT_LOG_COMPACTION_INTERVAL,
+            sink=self._insert_logged_engagement if self.sql_engine is not None else None,
+            max_store_attempts=Config.ENGAGEMENT_LOG_MAX_STORE_ATTEMPTS
+        )
+        self.engagement_watermark = 0
+        self.engagement_tailer = None
+        with startup_phase('datasets'):
+            self.load_datasets()
+        if self.sql_engine is not None:
+            # Created before this worker logs events, so every row it inserts gets claimed
+            self.engagement_tailer = EngagementTailer(
+                self.sql_engine,
+                self.apply_engagement,
+                watermark=self.engagement_watermark,
+                interval=Config.ENGAGEMENT_SYNC_INTERVAL,
+                batch_size=Config.ENGAGEMENT_SYNC_BATCH,
+                gap_timeout=Config.ENGAGEMENT_SYNC_GAP_TIMEOUT
+            )
+        self.engagement_log.start()
+        self.model_registry = ModelRegistry(model_registry_dir, keep=Config.MODEL_REGISTRY_KEEP)
+        self.registry_version: Optional[str] = None
+        with startup_phase('models'):
+            self.load_or_train_models()
+        self.retrain_scheduler = RetrainScheduler(
+            self,
+            interval=Config.RETRAIN_INTERVAL,
+            interaction_threshold=Config.RETRAIN_INTERACTION_THRESHOLD,
+            catalog_threshold=Config.RETRAIN_CATALOG_THRESHOLD,
+            reload_interval=Config.MODEL_RELOAD_INTERVAL,
+            **self._training_options()
+        )
+        self.retrain_scheduler.start()
+        self.interaction_queue = InteractionQueue(
+            self._apply_queued_interactions,
+            max_size=Config.INTERACTION_QUEUE_SIZE,
+            batch_size=Config.INTERACTION_BATCH_SIZE,
+            max_delay=Config.INTERACTION_BATCH_DELAY,
+            put_timeout=Config.INTERACTION_QUEUE_TIMEOUT
+        )
+        self.interaction_queue.start()
+        Thread(target=self._refresh_aggregates_periodically, name='engagement-aggregates', daemon=True).start()
+        if self.engagement_tailer is not None:
+            self.engagement_tailer.start()
+        track_engine(self)
+
+    @property
+    def models(self) -> Optional[ModelGeneration]:
+        return self.snapshot.models
+
+    @property
+    def courses(self) -> pd.DataFrame:
+        return self.snapshot.courses
+
+    @property
+    def available_courses_index(self) -> Set:
+        return self.snapshot.available_courses_index
+
+    @property
+    def model_version(self) -> int:
+        return self.models.version if self.models is not None else 0
+    
+    def _create_sparse_matrix(self, engagement: pd.DataFrame) -> UserItemMatrix:
+        """
+        Creates the incrementally maintained user-item (student-course) matrix from the engagement data.
+        """
+        try:
+            # Ensure the engagement data has the required columns
+            if not all(col in engagement.columns for col in ['student_id', 'course_id', 'rating']):
+                raise ValueError("Engagement data is missing required columns: 'student_id', 'course_id', 'rating'")
+
+            return UserItemMatrix.from_frame(engagement)
+        except Exception as e:
+            logger.error(f"Error creating sparse matrix: {e}")
+            raise
+    def _catalog_state(self, courses: pd.DataFrame) -> Dict:
+        """
+        Builds the catalog fields of a snapshot: the courses and the lookups aligned to their rows.
+        """
+        try:
+            if 'course_id' not in courses.columns:
+                raise ValueError("Courses dataset is missing the required 'course_id' column")
+            course_positions = {course_id: position for position, course_id in enumerate(courses['course_id'])}
+            return {
+                'courses': courses,
+                'available_courses_index': set(courses['course_id']),
+                'course_positions': course_positions,
+                'course_difficulty_rank': courses['difficulty'].astype(str).str.lower().map(SKILL_LEVELS).fillna(0).to_numpy(),
+                'course_code_positions': self._course_code_positions(course_positions)
+            }
+        except Exception as e:
+            logger.error(f"Error updating available courses: {e}")
+            raise
+
+    def load_datasets(self) -> None:
+        try:
+            if self.sql_engine is not None:
+                # Events whose writer exited before storing them are inserted before the table is read
+                self.engagement_log.compact()
+                students, courses = self._load_database_datasets()
+            else:
+                students, courses = self._load_file_datasets()
+            self.valid_student_ids = set(students['student_id']).union(self.engagement.student_ids)
+            self.user_item_matrix = self._create_sparse_matrix(
+                self.engagement.to_frame(['student_id', 'course_id', 'rating'])
+            )
+            catalog = self._catalog_state(courses)
+            self.snapshot = EngineSnapshot(
+                version=1,
+                models=None,
+                engagement=self.engagement,
+                engagement_rows=len(self.engagement),
+                engagement_students=len(self.engagement.student_ids),
+                cached_engagement_scores=StudentEngagementScores.from_frame(
+                    self.engagement.to_frame(['student_id', *StudentEngagementScores.SUM_COLUMNS]),
+                    expected_time_total=courses['average_time'].sum()
+                ),
+                **catalog,
+                **self._course_popularity_sums(catalog['course_code_positions'], len(courses)),
+                **self._aggregates(courses, catalog['course_code_positions'])
+            )
+            usage = self.engagement.memory_usage()
+            logger.info(
+                f"Datasets loaded successfully: {usage['interactions']} interactions "
+                f"at {usage['bytes_per_interaction']:.1f} bytes each"
+            )
+        except Exception as e:
+            logger.error(f"Error loading datasets: {e}")
+            raise
+
+    def _load_file_datasets(self) -> Tuple[pd.DataFrame, pd.DataFrame]:
+        students = load_dataset(students_path, 'students', Config.DATASET_FORMAT, columns=['student_id'])
+        courses = self._load_source_courses()
+        engagement, replayed = self.engagement_log.replay_with_snapshot(lambda: load_dataset(
+            engagement_path,
+            'engagement',
+            Config.DATASET_FORMAT,
+            columns=['student_id', 'course_id', *EngagementStore.METRICS]
+        ))
+        self.engagement = EngagementStore.from_frame(engagement)
+        if not replayed.empty:
+            self.engagement.extend(replayed)
+            logger.info(f"Replayed {len(replayed)} logged engagement events")
+        return students, courses
+
+    def _load_database_datasets(self) -> Tuple[pd.DataFrame, pd.DataFrame]:
+        """
+        Streams the students, courses and engagements tables in chunks of
+        DATABASE_CHUNK_SIZE rows. Each engagement chunk is packed into the
+        store and dropped before the next one is fetched.
+        """
+        chunk_size = Config.DATABASE_CHUNK_SIZE
+        students = db_source.load_students(self.sql_engine, chunk_size)
+        courses = self._load_source_courses()
+        self.engagement = EngagementStore()
+        for chunk in db_source.stream_engagement(self.sql_engine, chunk_size):
+            self.engagement.extend(chunk)
+            if not chunk.empty:
+                self.engagement_watermark = max(self.engagement_watermark, int(chunk['id'].max()))
+        return students, courses
+
+    def _load_source_courses(self) -> pd.DataFrame:
+        """
+        Reads the catalog from the dataset source every worker shares, which
+        has every other worker's catalog edits as well as this one's.
+        """
+        if self.sql_engine is not None:
+            return db_source.load_courses(self.sql_engine, Config.DATABASE_CHUNK_SIZE)
+        return load_dataset(courses_path, 'courses', Config.DATASET_FORMAT)
+
+    def _insert_logged_engagement(self, engagement: pd.DataFrame, own: bool) -> None:
+        # Events recovered from another worker's log are new to this one, so the tailer must apply them
+        on_inserted = self.engagement_tailer.claim if own and self.engagement_tailer is not None else None
+        db_source.insert_engagement(self.sql_engine, engagement, on_inserted=on_inserted)
+
+    def load_or_train_models(self) -> None:
+        try:
+            # Held while training too, so workers starting together train once and the rest load the result
+            with self.model_registry.lock():
+                if not self.reload_models():
+                    self._train_new_models()
+        except Exception as e:
+            logger.error(f"Error in model initialization: {e}")
+            raise
+
+    def reload_models(self) -> bool:
+        """
+        Activates the registry's current version unless it is already active.
+        Versions are trained on the shared catalog, so the catalog is re-read
+        from the source with them, picking up other workers' edits. Returns
+        False when there is no saved version usable with that catalog.
+        """
+        version = self.model_registry.current_version()
+        if version is None:
+            return False
+        if version == self.registry_version:
+            return True
+        models = self.model_registry.load(version)
+        del models['version']
+        # Both the factors and the neighbour graph are aligned to catalog positions
+        course_ids = models['cf_scorer'].course_ids
+        courses = self._load_source_courses()
+        if len(courses) != len(course_ids) or not courses['course_id'].isin(course_ids).all():
+            logger.info(f"Model version {version} was built for a different catalog")
+            return False
+        courses = courses.set_index('course_id', drop=False).loc[course_ids].reset_index(drop=True)
+        if self.activate_models(registry_version=version, courses=courses, **models) is None:
+            logger.info(f"Catalog changed while model version {version} was loading")
+            return False
+        logger.info(f"Models loaded successfully from version {version}")
+        return True
+
+    def save_and_activate_models(self, cf_scorer, tfidf_vectorizer, cbf_model, training_seconds: float = None,
+                                 course_ids: np.ndarray = None,
+                                 snapshot_time: float = None) -> Optional[ModelGeneration]:
+        """
+        Saves freshly trained models to the registry and activates them as
+        reopened from it, so this worker maps the same pages as the others.
+        Returns None without saving when the catalog changed while they trained.
+        """
+        courses = None
+        if course_ids is not None:
+            courses = self._load_source_courses()
+            if not np.array_equal(course_ids, courses['course_id'].to_numpy()):
+                return None
+        version = self.model_registry.save(cf_scorer, tfidf_vectorizer, cbf_model, snapshot_time=snapshot_time)
+        logger.info("Models saved successfully")
+        models = self.model_registry.load(version)
+        del models['version']
+        return self.activate_models(
+            training_seconds=training_seconds,
+            registry_version=version,
+            courses=courses,
+            **models
+        )
+
+    def activate_models(self, cf_scorer, tfidf_vectorizer, cbf_model, training_seconds: float = None,
+                        course_ids: np.ndarray = None, registry_version: str = None,
+                        snapshot_time: float = None, courses: pd.DataFrame = None) -> Optional[ModelGeneration]:
+        """
+        Builds the next model generation and publishes it in a new snapshot.
+        Requests already running keep the generation they started with, and
+        cached results from older generations become unreachable. When
+        `course_ids` is given and no longer matches the catalog (courses were
+        added while the models trained), nothing is published and None is returned.
+        `courses` is the catalog the models were built for, read from the
+        source; if it differs from this worker's, everything aligned to the
+        catalog is rebuilt from it in the same snapshot, and None is returned
+        if it lacks a course this worker has added since it was read.
+        Students with interactions since `snapshot_time`, which the models
+        were trained without, are folded into the new CF scorer first.
+        """
+        with self.data_lock:
+            if course_ids is not None and not np.array_equal(course_ids, self.courses['course_id'].to_numpy()):
+                return None
+            catalog_changes = {}
+            if courses is not None and self._catalog_differs(courses, self.courses):
+                if not self.courses['course_id'].isin(courses['course_id']).all():
+                    return None
+                catalog_changes = self._rebuild_catalog(courses)
+            course_positions = catalog_changes.get('course_positions', self.snapshot.course_positions)
+            catalog = catalog_changes.get('courses', self.courses)
+            if training_seconds is not None:
+                MODEL_TRAINING_DURATION.observe(training_seconds)
+            if snapshot_time is not None:
+                missed = [
+                    student_id for student_id, updated_at in self._student_updated_at.items()
+                    if updated_at >= snapshot_time
+                ]
+                if missed:
+                    self._fold_in_students(missed, cf_scorer, course_positions)
+                    logger.info(f"Folded {len(missed)} students updated since the training snapshot into the new models")
+            models = ModelGeneration(
+                version=self.model_version + 1,
+                cf_scorer=cf_scorer,
+                tfidf_vectorizer=tfidf_vectorizer,
+                cbf_model=cbf_model,
+                # Vectorized once so cold-start requests only need a single sparse dot product
+                course_feature_matrix=tfidf_vectorizer.transform(catalog['features']).tocsr()
+            )
+            self._publish(models=models, **catalog_changes)
+            self.registry_version = registry_version
+            return models
+
+    def upsert_courses(self, course_rows: List[Dict]) -> Dict[str, int]:
+        """
+        Adds new courses and applies edits to existing ones without retraining.
+
+        Only the changed rows are vectorized, against the current (frozen)
+        TF-IDF vocabulary, and only their neighbour lists are recomputed; CF
+        gives new courses zero factors until fold-in or the next retrain learns
+        them. Terms outside the vocabulary are ignored until the scheduled
+        full refit, which every update counts towards.
+        """
+        updates = pd.DataFrame(course_rows).drop_duplicates(subset='course_id', keep='last')
+        with self.data_lock:
+            snapshot = self.snapshot
+            models = snapshot.models
+            existing = updates['course_id'].map(snapshot.course_positions)
+            edited = updates[existing.notna()]
+            added = updates[existing.isna()]
+            edited_positions = existing.dropna().astype(int).to_numpy()
+
+            courses = snapshot.courses.copy()
+            for column in edited.columns.drop('course_id'):
+                # Fields an edit leaves out keep their current values
+                provided = edited[column].notna().to_numpy()
+                values = edited.loc[provided, column]
+                if column in courses.columns:
+                    values = values.astype(courses[column].dtype)
+                courses.loc[edited_positions[provided], column] = values.to_numpy()
+            courses = pd.concat([courses, added], ignore_index=True)
+            changed_positions = np.concatenate([edited_positions, np.arange(len(snapshot.courses), len(courses))])
+
+            changed_features = models.tfidf_vectorizer.transform(courses['features'].iloc[changed_positions]).tocsr()
+            course_feature_matrix = replace_rows(
+                models.course_feature_matrix, changed_positions, changed_features, len(courses)
+            )
+            cbf_model = update_similarity_graph(
+                models.cbf_model,
+                course_feature_matrix,
+                changed_positions,
+                k=Config.CBF_NEIGHBOURS,
+                block_size=Config.CBF_BLOCK_SIZE
+            )
+            cf_scorer = models.cf_scorer
+            if len(added):
+                cf_scorer = cf_scorer.with_catalog(courses['course_id'].to_numpy())
+
+            catalog = self._catalog_state(courses)
+            content_types = self._content_type_codes(courses, catalog['course_code_positions'])
+            if self._course_types_changed(
+                self._content_type_codes(snapshot.courses, snapshot.course_code_positions), content_types
+            ):
+                # Per-student type sums cannot be re-derived from per-course ones, so recount them
+                student_progress = StudentProgressProfiles.from_store(self.engagement, *content_types)
+            else:
+                student_progress = snapshot.student_progress.with_content_types(content_types[0])
+            # Models, catalog and everything aligned to it change in one swap
+            self._publish(
+                models=ModelGeneration(
+                    version=models.version + 1,
+                    cf_scorer=cf_scorer,
+                    tfidf_vectorizer=models.tfidf_vectorizer,
+                    cbf_model=cbf_model,
+                    course_feature_matrix=course_feature_matrix
+                ),
+                course_rating_sum=np.pad(snapshot.course_rating_sum, (0, len(added))),
+                course_rating_count=np.pad(snapshot.course_rating_count, (0, len(added))),
+                cached_engagement_scores=snapshot.cached_engagement_scores.copy(
+                    expected_time_total=courses['average_time'].sum()
+                ),
+                content_performance=snapshot.content_performance.with_content_types(*content_types),
+                student_progress=student_progress,
+                **catalog
+            )
+            self._save_courses(courses.iloc[changed_positions])
+        self.retrain_scheduler.record_catalog_changes(len(updates))
+        logger.info(f"Catalog updated: {len(added)} courses added, {len(edited)} edited")
+        return {'added': len(added), 'updated': len(edited)}
+
+    def _publish(self, **changes) -> None:
+        """
+        Publishes the next snapshot with `changes` applied, covering every
+        engagement row appended so far. Callers hold data_lock.
+        """
+        snapshot = self.snapshot
+        if 'course_code_positions' not in changes and len(self.engagement.course_ids) >= len(snapshot.course_code_positions):
+            # New courses appeared in the store since the map was built
+            changes['course_code_positions'] = self._course_code_positions(snapshot.course_positions)
+        self.snapshot = snapshot.replace(
+            engagement_rows=len(self.engagement),
+            engagement_students=len(self.engagement.student_ids),
+            **changes
+        )
+
+    def _save_courses(self, changed: pd.DataFrame) -> None:
+        # Only the changed rows, so edits other workers saved in the meantime are kept
+        if self.sql_engine is not None:
+            db_source.upsert_courses(self.sql_engine, changed)
+        else:
+            upsert_rows(changed, dataset_path(courses_path, Config.DATASET_FORMAT), 'courses', 'course_id')
+
+    def training_snapshot(self) -> Tuple[pd.DataFrame, pd.DataFrame]:
+        """
+        Returns the ratings and the shared catalog from the source, so models
+        cover courses other workers added and every worker can load them.
+        """
+        with self.data_lock:
+            engagement = self.engagement.to_frame(['student_id', 'course_id', 'rating'])
+        return (
+            engagement.dropna(subset=['course_id']).astype({'course_id': 'int64'}),
+            self._load_source_courses()[['course_id', 'features']]
+        )
+
+    @staticmethod
+    def _catalog_differs(courses: pd.DataFrame, current: pd.DataFrame) -> bool:
+        columns = list(courses.columns)
+        if list(current.columns) != columns or len(courses) != len(current):
+            return True
+        # Compared under the dataset schema, so dtype drift from in-place edits does not count
+        return not apply_schema(courses.reset_index(drop=True), 'courses').equals(
+            apply_schema(current.reset_index(drop=True), 'courses')
+        )
+
+    def _rebuild_catalog(self, courses: pd.DataFrame) -> Dict:
+        """
+        Builds every catalog-aligned snapshot field from scratch for `courses`,
+        for a catalog other workers changed. Callers hold data_lock.
+        """
+        catalog = self._catalog_state(courses.reset_index(drop=True))
+        return {
+            **catalog,
+            **self._course_popularity_sums(catalog['course_code_positions'], len(courses)),
+            **self._aggregates(catalog['courses'], catalog['course_code_positions']),
+            'cached_engagement_scores': self.snapshot.cached_engagement_scores.copy(
+                expected_time_total=courses['average_time'].sum()
+            )
+        }
+
+    @staticmethod
+    def _training_options() -> Dict:
+        return {
+            'n_factors': Config.CF_FACTORS,
+            'neighbours': Config.CBF_NEIGHBOURS,
+            'block_size': Config.CBF_BLOCK_SIZE
+        }
+
+    def _course_popularity_sums(self, course_code_positions: np.ndarray, n_courses: int) -> Dict[str, np.ndarray]:
+        """
+        Builds the per-course rating sums and counts, aligned with the catalog rows.
+        """
+        positions = course_code_positions[self.engagement.course_codes]
+        valid = positions >= 0
+        positions = positions[valid]
+        ratings = np.nan_to_num(self.engagement.metric('rating')[valid].astype(float))
+        return {
+            'course_rating_sum': np.bincount(positions, weights=ratings, minlength=n_courses),
+            'course_rating_count': np.bincount(positions, minlength=n_courses).astype(float)
+        }
+
+    def _course_code_positions(self, course_positions: Dict) -> np.ndarray:
+        """
+        Maps the engagement store's course codes to catalog positions, with -1
+        for courses not in the catalog. The trailing entry maps rows without a
+        course (code -1) to -1 as well.
+        """
+        return np.array(
+            [course_positions.get(course_id, -1) for course_id in self.engagement.course_ids] + [-1],
+            dtype=np.int64
+        )
+
+    @staticmethod
+    def _content_type_codes(courses: pd.DataFrame, course_code_positions: np.ndarray) -> Tuple[List[str], np.ndarray]:
+        """
+        Returns the catalog's content types and, for each engagement store
+        course code, the index of its course's content type (-1 if unknown).
+        """
+        content_types = courses['content_type'].astype('category')
+        type_codes = np.append(content_types.cat.codes.to_numpy(dtype=np.int64), -1)
+        return list(content_types.cat.categories), type_codes[course_code_positions[:-1]]
+
+    @staticmethod
+    def _course_types_changed(old: Tuple[List[str], np.ndarray], new: Tuple[List[str], np.ndarray]) -> bool:
+        """
+        Whether any engaged course's content type differs between two results of _content_type_codes.
+        """
+        old_names, new_names = (
+            np.append(np.asarray(content_types, dtype=object), None)[course_types]
+            for content_types, course_types in (old, new)
+        )
+        return not np.array_equal(old_names, new_names)
+
+    def _aggregates(self, courses: pd.DataFrame, course_code_positions: np.ndarray) -> Dict:
+        content_types, course_types = self._content_type_codes(courses, course_code_positions)
+        return {
+            'content_performance': ContentPerformanceAggregates.from_store(self.engagement, content_types, course_types),
+            'student_progress': StudentProgressProfiles.from_store(self.engagement, content_types, course_types)
+        }
+
+    def refresh_aggregates(self) -> None:
+        """
+        Recomputes the content-performance and student progress sums exactly
+        from the store, discarding any floating-point drift from incremental updates.
+        """
+        with self.data_lock:
+            # Maps any course codes the snapshot has not seen yet
+            course_code_positions = self._course_code_positions(self.snapshot.course_positions)
+            self._publish(
+                course_code_positions=course_code_positions,
+                **self._aggregates(self.courses, course_code_positions)
+            )
+        logger.info("Engagement aggregates recomputed")
+
+    def _refresh_aggregates_periodically(self) -> None:
+        while True:
+            time.sleep(Config.ENGAGEMENT_AGGREGATES_REFRESH_INTERVAL)
+            try:
+                self.refresh_aggregates()
+            except Exception as e:
+                logger.error(f"Error recomputing engagement aggregates: {e}")
+
+    @staticmethod
+    def _top_n_positions(scores: np.ndarray, n: int) -> np.ndarray:
+        """
+        Returns the positions of the n highest finite scores, best first.
+        """
+        candidates = np.flatnonzero(np.isfinite(scores))
+        if len(candidates) > n:
+            candidates = candidates[np.argpartition(scores[candidates], -n)[-n:]]
+        return candidates[np.argsort(scores[candidates])[::-1]]
+
+    def _train_new_models(self) -> None:
+        logger.info("Training new models...")
+        started = time.perf_counter()
+        models = train_models(*self.training_snapshot(), **self._training_options())
+        self.save_and_activate_models(training_seconds=time.perf_counter() - started, **models)
+
+    async def get_hybrid_recommendations(self, student_id: int, n: int = 5) -> Optional[Dict[str, Union[List, float]]]:
+        """
+        Returns the student's top-n recommendations, or None for a student
+        with no interactions and no profile to cold-start from.
+        """
+        # Read before the snapshot, so a write published after it makes the result uncacheable
+        generation = self.recommendation_cache.generation(student_id)
+        # Every part of the response is computed against this one snapshot
+        snapshot = self.snapshot
+        version = snapshot.models.version
+        cached = self.recommendation_cache.get(student_id, n, version)
+        if cached is not None:
+            RECOMMENDATION_CACHE_HITS.inc()
+            return cached
+        RECOMMENDATION_CACHE_MISSES.inc()
+        result = await self._compute_hybrid_recommendations(student_id, n, snapshot)
+        if result is not None:
+            self.recommendation_cache.set(student_id, n, version, result, generation=generation)
+        return result
+
+    async def _compute_hybrid_recommendations(self, student_id: int, n: int,
+                                              snapshot: EngineSnapshot) -> Optional[Dict[str, Union[List, float]]]:
+        with RECOMMENDATION_LATENCY.time():
+            # Check if student has any interactions
+            if snapshot.student_code(student_id) is None:
+                # New user - use cold start strategy
+                with stage_timer('cold_start'):
+                    student = Student.query.get(student_id)
+                    return self._cold_start_recommendations(student, n, snapshot) if student else None
+
+            else:
+                # Existing user - use hybrid recommendations
+                with stage_timer('engagement_normalization'):
+                    normalized_engagement = self.normalize_engagement_score(student_id, snapshot)
+            
+                cf_task = asyncio.to_thread(self.get_cf_recommendations, student_id, n, snapshot)
+                cbf_task = asyncio.to_thread(self.get_cbf_recommendations, student_id, n, snapshot)
+            
+                cf_recs, cbf_recs = await asyncio.gather(cf_task, cbf_task)
+            
+                with stage_timer('fusion'):
+                    hybrid_recs = self._combine_recommendations(
+                        cf_recs, 
+                        cbf_recs, 
+                        normalized_engagement
+                    )
+                    recommendations = sorted(hybrid_recs, key=lambda x: x['confidence'], reverse=True)[:n]
+            
+                return {
+                    'recommendations': recommendations,
+                    'engagement_score': normalized_engagement
+                }
+
+    def _cold_start_recommendations(self, student: Student, n: int,
+                                    snapshot: EngineSnapshot) -> Dict[str, Union[List, float]]:
+        models = snapshot.models
+        # TF-IDF rows are L2-normalized, so the dot product is the cosine similarity
+        student_profile = ' '.join(student.interests or [])
+        profile_vector = models.tfidf_vectorizer.transform([student_profile])
+        content_similarities = (models.course_feature_matrix @ profile_vector.T).toarray().ravel()
+
+        # Combine popularity and content-based scores
+        scores = (0.6 * snapshot.course_popularity()) + (0.4 * content_similarities)
+        skill_rank = SKILL_LEVELS.get(str(student.skill_level).lower(), max(SKILL_LEVELS.values()))
+        scores[snapshot.course_difficulty_rank > skill_rank] = -np.inf
+
+        recommendations = []
+        for position in self._top_n_positions(scores, n):
+            course = snapshot.courses.iloc[position]
+            recommendations.append({
+                'course_id': int(course['course_id']),
+                'course_name': course['course_name'],
+                'confidence': float(scores[position]),
+                'reason': 'Based on your interests and popular courses'
+            })
+
+        return {
+            'recommendations': recommendations,
+            'engagement_score': 0.0
+        }
+
+    def iter_batch_recommendations(self, student_ids: List[int], n: int = 5) -> Iterator[Tuple[int, Dict]]:
+        """
+        Yields (student_id, result) pairs, computing results one chunk at a time.
+
+        Within a chunk, cached results are reused, cold-start profiles are fetched
+        with one query, CF is scored as a single matrix multiply and the CBF half
+        is spread across the worker pool. A result is None when a new student
+        has no profile to build cold-start recommendations from.
+        """
+        for start in range(0, len(student_ids), Config.RECOMMENDATION_BATCH_CHUNK):
+            chunk = student_ids[start:start + Config.RECOMMENDATION_BATCH_CHUNK]
+            generations = {student_id: self.recommendation_cache.generation(student_id) for student_id in chunk}
+            snapshot = self.snapshot
+            version = snapshot.models.version
+            results = {}
+            for student_id in chunk:
+                cached = self.recommendation_cache.get(student_id, n, version)
+                if cached is not None:
+                    RECOMMENDATION_CACHE_HITS.inc()
+                    results[student_id] = cached
+            pending = list(dict.fromkeys(student_id for student_id in chunk if student_id not in results))
+            RECOMMENDATION_CACHE_MISSES.inc(len(pending))
+
+            warm = [student_id for student_id in pending if snapshot.student_code(student_id) is not None]
+            cold = [student_id for student_id in pending if snapshot.student_code(student_id) is None]
+
+            if cold:
+                with stage_timer('cold_start'):
+                    profiles = {student.id: student for student in Student.query.filter(Student.id.in_(cold))}
+                    for student_id in cold:
+                        student = profiles.get(student_id)
+                        results[student_id] = self._cold_start_recommendations(student, n, snapshot) if student else None
+
+            if warm:
+                cf_recs = self.get_cf_recommendations_batch(warm, n, snapshot)
+                cbf_recs = self.cbf_pool.map(lambda student_id: self.get_cbf_recommendations(student_id, n, snapshot), warm)
+                for student_id, student_cbf_recs in zip(warm, cbf_recs):
+                    with stage_timer('engagement_normalization'):
+                        normalized_engagement = self.normalize_engagement_score(student_id, snapshot)
+                    with stage_timer('fusion'):
+                        hybrid_recs = self._combine_recommendations(
+                            cf_recs[student_id],
+                            student_cbf_recs,
+                            normalized_engagement
+                        )
+                        recommendations = sorted(hybrid_recs, key=lambda x: x['confidence'], reverse=True)[:n]
+                    results[student_id] = {
+                        'recommendations': recommendations,
+                        'engagement_score': normalized_engagement
+                    }
+
+            for student_id in pending:
+                if results[student_id] is not None:
+                    self.recommendation_cache.set(
+                        student_id, n, version, results[student_id], generation=generations[student_id]
+                    )
+            for student_id in chunk:
+                yield student_id, results[student_id]
+
+    def get_cf_recommendations(self, student_id: int, n: int, snapshot: EngineSnapshot = None) -> List[Dict]:
+        return self.get_cf_recommendations_batch([student_id], n, snapshot)[student_id]
+
+    def get_cf_recommendations_batch(self, student_ids: List[int], n: int,
+                                     snapshot: EngineSnapshot = None) -> Dict[int, List[Dict]]:
+        """
+        Scores every catalog course for all given students with one matrix multiply.
+        """
+        with stage_timer('cf_scoring'):
+            return self._cf_recommendations_batch(student_ids, n, snapshot or self.snapshot)
+
+    def _cf_recommendations_batch(self, student_ids: List[int], n: int,
+                                  snapshot: EngineSnapshot) -> Dict[int, List[Dict]]:
+        student_ids = list(dict.fromkeys(student_ids))
+        scores = snapshot.models.cf_scorer.score(student_ids)
+
+        # Mask out courses each student has already taken
+        student_rows = [snapshot.student_rows(student_id) for student_id in student_ids]
+        seen = np.concatenate(student_rows) if student_rows else np.empty(0, dtype=np.int64)
+        seen_rows = np.repeat(np.arange(len(student_ids)), [len(rows) for rows in student_rows])
+        seen_positions = snapshot.course_code_positions[snapshot.engagement.course_codes[seen]]
+        valid = seen_positions >= 0
+        scores[seen_rows[valid], seen_positions[valid]] = -np.inf
+
+        recommendations = {}
+        for row, student_id in enumerate(student_ids):
+            recommendations[student_id] = []
+            for position in self._top_n_positions(scores[row], n):
+                course = snapshot.courses.iloc[position]
+                recommendations[student_id].append({
+                    'course_id': int(course['course_id']),
+                    'course_name': course['course_name'],
+                    'confidence': float(scores[row, position]) / 5,
+                    'reason': 'Students with similar activity rated this highly'
+                })
+        return recommendations
+
+    def get_cbf_recommendations(self, student_id: int, n: int, snapshot: EngineSnapshot = None) -> List[Dict]:
+        with stage_timer('cbf_scoring'):
+            return self._cbf_recommendations(student_id, n, snapshot or self.snapshot)
+
+    def _cbf_recommendations(self, student_id: int, n: int, snapshot: EngineSnapshot) -> List[Dict]:
+        rows = snapshot.student_rows(student_id)
+        positions = snapshot.course_code_positions[snapshot.engagement.course_codes[rows]]
+        valid = positions >= 0
+        if not valid.any():
+            return []
+
+        # Mean rating per course the student took; unrated courses weigh 0
+        seen_positions, inverse = np.unique(positions[valid], return_inverse=True)
+        ratings = snapshot.engagement.metric('rating')[rows[valid]].astype(float)
+        rated = ~np.isnan(ratings)
+        rating_sums = np.bincount(inverse[rated], weights=ratings[rated], minlength=len(seen_positions))
+        rating_counts = np.bincount(inverse[rated], minlength=len(seen_positions))
+        weights = np.divide(rating_sums, rating_counts, out=np.zeros(len(seen_positions)), where=rating_counts > 0)
+        scores = snapshot.models.cbf_model[seen_positions].T @ weights / max(weights.sum(), 1e-9)
+        # Only courses that neighbour something the student took are candidates
+        scores[scores <= 0] = -np.inf
+        scores[seen_positions] = -np.inf
+
+        recommendations = []
+        for position in self._top_n_positions(scores, n):
+            course = snapshot.courses.iloc[position]
+            recommendations.append({
+                'course_id': int(course['course_id']),
+                'course_name': course['course_name'],
+                'confidence': float(scores[position]),
+                'reason': 'Similar to courses you rated highly'
+            })
+        return recommendations
+
+    def get_similar_courses(self, course_id: int, n: int = 10) -> List[Dict]:
+        snapshot = self.snapshot
+        position = snapshot.course_positions[course_id]
+        neighbours = snapshot.models.cbf_model[position]
+        order = np.argsort(neighbours.data)[::-1][:n]
+
+        similar_courses = []
+        for neighbour, similarity in zip(neighbours.indices[order], neighbours.data[order]):
+            course = snapshot.courses.iloc[neighbour]
+            similar_courses.append({
+                'course_id': int(course['course_id']),
+                'course_name': course['course_name'],
+                'similarity': float(similarity)
+            })
+        return similar_courses
+
+    def _combine_recommendations(self, cf_recs: List[Dict], cbf_recs: List[Dict], engagement: float) -> List[Dict]:
+        # Highly engaged students have enough history for CF to be trusted more
+        cf_weight = 0.5 + 0.3 * float(engagement)
+        cbf_weight = 1 - cf_weight
+
+        combined = {}
+        for recs, weight in ((cf_recs, cf_weight), (cbf_recs, cbf_weight)):
+            for rec in recs:
+                entry = combined.setdefault(rec['course_id'], {**rec, 'confidence': 0.0})
+                entry['confidence'] += weight * rec['confidence']
+        return list(combined.values())
+
+    async def log_interaction(self, interaction_data: Dict) -> Optional[str]:
+        """
+        Validates an interaction with the same rules as bulk ingestion and
+        queues the typed record to be applied with the next micro-batch.
+        Returns why it is invalid, or None once it is queued; raises
+        queue.Full if the queue stays full for INTERACTION_QUEUE_TIMEOUT seconds.
+        """
+        INTERACTION_COUNTER.inc()
+        valid, errors = validate_interactions(
+            pd.DataFrame([interaction_data]), self.valid_student_ids, self.snapshot.available_courses_index
+        )
+        if len(errors):
+            logger.warning(f"Rejected interaction {interaction_data}: {errors.iloc[0]}")
+            return errors.iloc[0]
+        await asyncio.to_thread(self.interaction_queue.submit, valid.to_dict('records')[0])
+        return None
+
+    def ingest_interactions(self, interactions: pd.DataFrame) -> pd.Series:
+        """
+        Validates a chunk of interactions against the known students and
+        courses and applies the valid rows as one batch, without queueing or
+        CF fold-in. Returns the error for each rejected row, indexed like `interactions`.
+        """
+        INTERACTION_COUNTER.inc(len(interactions))
+        valid, errors = validate_interactions(
+            interactions, self.valid_student_ids, self.snapshot.available_courses_index
+        )
+        if len(valid):
+            # Backfills are left to the retrain they trigger instead of being folded in chunk by chunk
+            self._apply_queued_interactions(valid.to_dict('records'), fold_in=False)
+        return errors
+
+    def _apply_queued_interactions(self, interactions: List[Dict], fold_in: bool = True) -> None:
+        with self.data_lock:
+            applied = self._apply_interactions(interactions, fold_in=fold_in)
+            batch = self.engagement_log.append_many(applied) if applied else None
+        if batch is not None:
+            # Outside data_lock, so readers and the next batch do not wait on the database
+            self.engagement_log.store(batch, applied)
+
+    def apply_engagement(self, engagement: pd.DataFrame) -> None:
+        """
+        Applies interactions that are already stored elsewhere (rows other
+        workers wrote to the database) to the in-memory structures.
+        """
+        with self.data_lock:
+            self._apply_interactions(engagement.astype(object).where(engagement.notna(), None).to_dict('records'))
+        logger.info(f"Applied {len(engagement)} engagement rows from the database")
+
+    def _apply_interactions(self, interactions: List[Dict], fold_in: bool = True) -> List[Dict]:
+        """
+        Applies a batch of interactions and publishes one snapshot for all of
+        them. The aggregate tables (whose copies share every row block the
+        batch does not touch) and the CF scorer are copied once, take the
+        whole batch (its students are folded in with one batched solve) and
+        are published with the snapshot; the batch's students are evicted
+        from the cache after the publish. Without `fold_in` the CF factors are
+        left to the retrain the batch counts towards. An event that cannot be
+        applied is logged and skipped; returns the ones that were applied.
+        Callers hold data_lock.
+        """
+        snapshot = self.snapshot
+        changes = {
+            'cached_engagement_scores': snapshot.cached_engagement_scores.copy(),
+            'content_performance': snapshot.content_performance.copy(),
+            'student_progress': snapshot.student_progress.copy()
+        }
+        applied, rows, positions = [], [], []
+        for interaction_data in interactions:
+            try:
+                row, position = self._apply_interaction(interaction_data, changes)
+            except Exception as e:
+                logger.error(f"Error applying interaction {interaction_data}: {e}")
+                continue
+            applied.append(interaction_data)
+            rows.append(row)
+            positions.append(position)
+        if not applied:
+            return applied
+        rows, positions = np.array(rows, dtype=np.int64), np.array(positions, dtype=np.int64)
+
+        position_types = pd.Categorical(
+            snapshot.courses['content_type'], categories=snapshot.content_performance.content_types
+        ).codes
+        content_types = np.where(positions >= 0, position_types[positions], -1)
+        metrics = {name: self.engagement.metric(name)[rows] for name in EngagementStore.METRICS}
+        changes['content_performance'].update(
+            self.engagement.course_codes[rows], content_types,
+            metrics['time_spent'], metrics['quiz_score'], metrics['rating']
+        )
+        changes['student_progress'].update(
+            self.engagement.student_codes[rows], content_types,
+            metrics['time_spent'], metrics['quiz_score'], metrics['completion_status'], metrics['rating']
+        )
+        students = list(dict.fromkeys(interaction_data['student_id'] for interaction_data in applied))
+        self._record_student_updates(students)
+        if fold_in:
+            cf_scorer = snapshot.models.cf_scorer.copy()
+            self._fold_in_students(students, cf_scorer)
+            changes['models'] = snapshot.models.with_cf_scorer(cf_scorer)
+        self._publish(**changes)
+        for student_id in students:
+            self.recommendation_cache.evict_student(student_id)
+        self.update_engagement_metrics()
+        self.retrain_scheduler.record_interactions(len(applied))
+        return applied
+
+    def _apply_interaction(self, interaction_data: Dict, changes: Dict) -> Tuple[int, int]:
+        """
+        Appends one interaction to the store and updates the per-event
+        structures, collecting the snapshot fields it replaces in `changes`
+        for the caller to publish. Returns the store row and the course's
+        catalog position, or -1. The store append comes first and commits
+        nothing if it fails. Callers hold data_lock.
+        """
+        snapshot = self.snapshot
+        row = self.engagement.append(interaction_data)
+        self.valid_student_ids.add(interaction_data['student_id'])
+        position = snapshot.course_positions.get(interaction_data['course_id'])
+        rating = interaction_data.get('rating')
+        if rating is not None:
+            self.user_item_matrix.upsert(interaction_data['student_id'], interaction_data['course_id'], rating)
+            if position is not None:
+                if 'course_rating_sum' not in changes:
+                    # Copied once per publish, so arrays readers hold are never written
+                    changes['course_rating_sum'] = snapshot.course_rating_sum.copy()
+                    changes['course_rating_count'] = snapshot.course_rating_count.copy()
+                changes['course_rating_sum'][position] += rating
+                changes['course_rating_count'][position] += 1
+        changes['cached_engagement_scores'].update(interaction_data)
+        return row, -1 if position is None else position
+
+    def _record_student_updates(self, student_ids: List[int]) -> None:
+        updated_at = time.time()
+        for student_id in student_ids:
+            self._student_updated_at.pop(student_id, None)
+            self._student_updated_at[student_id] = updated_at
+        # Only the most recent ones can postdate the next training snapshot
+        for student_id in list(islice(
+            self._student_updated_at, max(len(self._student_updated_at) - Config.CF_FOLD_IN_MAX_OVERRIDES, 0)
+        )):
+            del self._student_updated_at[student_id]
+
+    def _fold_in_students(self, student_ids: List[int], cf_scorer: FactorScorer,
+                          course_positions: Optional[Dict] = None) -> None:
+        """
+        Refits the students' CF factors in `cf_scorer` (an unpublished copy)
+        against all of their ratings in one batched solve, so new interactions
+        show up before the next full retrain corrects any drift.
+        `course_positions` defaults to the current snapshot's catalog.
+        """
+        if course_positions is None:
+            course_positions = self.snapshot.course_positions
+        positions, ratings = [], []
+        for student_id in student_ids:
+            student_ratings = self.user_item_matrix.student_ratings(student_id)
+            student_positions = np.array(
+                [course_positions.get(course_id, -1) for course_id in student_ratings], dtype=np.int64
+            )
+            student_values = np.fromiter(student_ratings.values(), dtype=np.float64, count=len(student_ratings))
+            rated = (student_positions >= 0) & (student_values > 0)
+            positions.append(student_positions[rated])
+            ratings.append(student_values[rated])
+        cf_scorer.fold_in(
+            student_ids,
+            positions,
+            ratings,
+            regularization=Config.CF_FOLD_IN_REGULARIZATION,
+            update_item_bias=Config.CF_FOLD_IN_ITEM_BIAS,
+            max_overrides=Config.CF_FOLD_IN_MAX_OVERRIDES
+        )
+
+    def calculate_engagement_metrics(self) -> Dict:
+        try:
+            # Served from running sums; cost depends on the catalog size, not on history
+            aggregates = self.snapshot.content_performance
+            return {
+                'overall_time': aggregates.mean_time_by_course(self.engagement.course_ids),
+                'content_performance': aggregates.content_performance(),
+                'avg_engagement_score': optional_mean(aggregates.average_engagement_score())
+            }
+        except Exception as e:
+            logger.error(f"Error calculating engagement metrics: {e}")
+            return {}
+
+    def calculate_engagement_score(self, student_id: int) -> float:
+        try:
+            score = self.snapshot.cached_engagement_scores.score(student_id)
+            if score is None:
+                logger.info(f"No engagement data found for student {student_id}")
+                return 0.0
+            return score
+        except Exception as e:
+            logger.error(f"Error calculating engagement score for student {student_id}: {e}")
+            return 0.0
+
+    def normalize_engagement_score(self, student_id: int, snapshot: EngineSnapshot = None) -> float:
+        try:
+            # Min-max normalized against every student in the score table
+            normalized_score = (snapshot or self.snapshot).cached_engagement_scores.normalized(student_id)
+            return 0.0 if normalized_score is None else normalized_score
+        except Exception as e:
+            logger.error(f"Error normalizing engagement score for student {student_id}: {e}")
+            return 0.0
+
+
+    def get_student_progress(self, student_id: int) -> Optional[Dict]:
+        """
+        Returns the student's progress report, or None for an unknown student.
+        """
+        if student_id not in self.valid_student_ids:
+            return None
+        # Served from the student's running sums; no per-request pass over their history
+        snapshot = self.snapshot
+        progress_metrics = snapshot.student_progress.progress(
+            snapshot.student_code(student_id),
+            snapshot.content_performance.average_time()
+        )
+        progress_metrics['ready_for_next'] = (
+            progress_metrics['engagement_score'] is not None and progress_metrics['engagement_score'] > 0.7 and
+            progress_metrics['quiz_performance'] is not None and progress_metrics['quiz_performance'] > 70
+        )
+        return progress_metrics
+
+    def update_engagement_metrics(self) -> None:
+        ENGAGEMENT_SCORE_GAUGE.set(self.snapshot.content_performance.average_engagement_score())
+    def initialize_student_engagement(self,student_id):
+        try:
+            new_engagement = {'student_id': student_id, 'course_id': None, 'rating': 0}
+            with self.data_lock:
+                self.engagement.append(new_engagement)
+                batch = self.engagement_log.append(new_engagement)
+                self.valid_student_ids.add(student_id)
+                self._publish()
+            if batch is not None:
+                self.engagement_log.store(batch, [new_engagement])
+            logger.info(f"Engagement initialized for student_id {student_id}")
+        except Exception as e:
+            logger.error(f"Error initializing engagement: {e}")
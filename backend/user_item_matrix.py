@@ -0,0 +1,121 @@
+from threading import Lock
+from typing import Dict, Hashable, List, Set, Tuple
+import numpy as np
+import pandas as pd
+from scipy.sparse import csr_matrix
+
+
+class UserItemMatrix:
+    """
+    Student x course rating matrix that supports cheap incremental upserts.
+
+    Student and course ids are mapped to stable row/column positions that are
+    only ever appended to. Writes land in a dictionary delta buffer and are
+    folded into the CSR matrix once the buffer grows past a fraction of the
+    matrix size, so each upsert costs O(1) amortized. When a student rates the
+    same course more than once, the latest rating wins. Readers see pending
+    upserts without forcing a merge.
+    """
+
+    def __init__(self, min_merge_size: int = 1024, merge_ratio: float = 0.1):
+        self.min_merge_size = min_merge_size
+        self.merge_ratio = merge_ratio
+        self.student_index: Dict[Hashable, int] = {}
+        self.course_index: Dict[Hashable, int] = {}
+        self.course_ids: List[Hashable] = []
+        self._matrix = csr_matrix((0, 0), dtype=np.float32)
+        self._delta: Dict[Tuple[int, int], float] = {}
+        self._delta_rows: Dict[int, Set[int]] = {}
+        # Delta cells the CSR matrix does not store yet, so nnz needs no merge
+        self._delta_new = 0
+        self._lock = Lock()
+
+    @classmethod
+    def from_frame(cls, engagement: pd.DataFrame, **kwargs) -> "UserItemMatrix":
+        matrix = cls(**kwargs)
+        ratings = engagement[['student_id', 'course_id', 'rating']].dropna(subset=['student_id', 'course_id'])
+        ratings = ratings.drop_duplicates(subset=['student_id', 'course_id'], keep='last')
+
+        student_codes, students = pd.factorize(ratings['student_id'], sort=True)
+        course_codes, courses = pd.factorize(ratings['course_id'], sort=True)
+        matrix.student_index = {student_id: row for row, student_id in enumerate(students)}
+        matrix.course_index = {course_id: col for col, course_id in enumerate(courses)}
+        matrix.course_ids = list(courses)
+        matrix._matrix = csr_matrix(
+            (ratings['rating'].fillna(0).to_numpy(dtype=np.float32), (student_codes, course_codes)),
+            shape=(len(students), len(courses))
+        )
+        return matrix
+
+    @property
+    def shape(self) -> Tuple[int, int]:
+        return len(self.student_index), len(self.course_index)
+
+    @property
+    def nnz(self) -> int:
+        """
+        Returns the number of stored cells, counting pending upserts without merging them.
+        """
+        with self._lock:
+            return self._matrix.nnz + self._delta_new
+
+    def upsert(self, student_id: Hashable, course_id: Hashable, rating: float) -> None:
+        with self._lock:
+            row = self.student_index.setdefault(student_id, len(self.student_index))
+            col = self.course_index.get(course_id)
+            if col is None:
+                col = self.course_index[course_id] = len(self.course_ids)
+                self.course_ids.append(course_id)
+            if (row, col) not in self._delta and not self._in_base(row, col):
+                self._delta_new += 1
+            self._delta[(row, col)] = rating
+            self._delta_rows.setdefault(row, set()).add(col)
+            if len(self._delta) > max(self.min_merge_size, self.merge_ratio * self._matrix.nnz):
+                self._merge()
+
+    def student_ratings(self, student_id: Hashable) -> Dict[Hashable, float]:
+        """
+        Returns {course_id: rating} for one student, including pending upserts.
+        """
+        row = self.student_index.get(student_id)
+        if row is None:
+            return {}
+        with self._lock:
+            ratings = {}
+            if row < self._matrix.shape[0]:
+                start, stop = self._matrix.indptr[row], self._matrix.indptr[row + 1]
+                for col, rating in zip(self._matrix.indices[start:stop], self._matrix.data[start:stop]):
+                    ratings[self.course_ids[col]] = float(rating)
+            for col in self._delta_rows.get(row, ()):
+                ratings[self.course_ids[col]] = float(self._delta[(row, col)])
+            return ratings
+
+    def _in_base(self, row: int, col: int) -> bool:
+        if row >= self._matrix.shape[0] or col >= self._matrix.shape[1]:
+            return False
+        start, stop = self._matrix.indptr[row], self._matrix.indptr[row + 1]
+        return bool(np.any(self._matrix.indices[start:stop] == col))
+
+    def _merge(self) -> None:
+        n_rows, n_cols = self.shape
+        base = self._matrix.tocoo()
+        if self._delta:
+            delta_positions = np.array(list(self._delta.keys()), dtype=np.int64)
+            delta_values = np.fromiter(self._delta.values(), dtype=np.float32, count=len(self._delta))
+        else:
+            delta_positions = np.empty((0, 2), dtype=np.int64)
+            delta_values = np.empty(0, dtype=np.float32)
+
+        rows = np.concatenate([base.row.astype(np.int64), delta_positions[:, 0]])
+        cols = np.concatenate([base.col.astype(np.int64), delta_positions[:, 1]])
+        values = np.concatenate([base.data.astype(np.float32), delta_values])
+
+        # Keep the last occurrence of each cell so delta entries override the base
+        keys = rows * n_cols + cols
+        _, last = np.unique(keys[::-1], return_index=True)
+        keep = len(keys) - 1 - last
+
+        self._matrix = csr_matrix((values[keep], (rows[keep], cols[keep])), shape=(n_rows, n_cols))
+        self._delta.clear()
+        self._delta_rows.clear()
+        self._delta_new = 0
@@ -0,0 +1,26 @@
+"""engagement created_at
+
+Revision ID: 3f9c2a7d1e54
+Revises: 76668bdbb4de
+Create Date: 2026-10-18 19:20:41.512337
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '3f9c2a7d1e54'
+down_revision = '76668bdbb4de'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('engagements', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('created_at', sa.DateTime(), server_default=sa.func.now(), nullable=True))
+
+
+def downgrade():
+    with op.batch_alter_table('engagements', schema=None) as batch_op:
+        batch_op.drop_column('created_at')